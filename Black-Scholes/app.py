@@ -1,9 +1,23 @@
+import os
+import sys
+from pathlib import Path
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy.stats import norm
 import plotly.graph_objects as go
 
+# Shared modules live at the repository root
+ROOT = str(Path(__file__).resolve().parents[1])
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from common.instrumentation import count, profiler_panel, span, start_profiling, timed
+from implied_vol import iv_surface, load_chain, solve_chain
+from lattice import (LATTICE_METHODS, SURFACE_MAX_STEPS, SURFACE_RESOLUTION, LatticePricingCalculator,
+                     lattice_surface, min_lattice_steps)
+from monte_carlo import BARRIER_TYPES, PAYOFFS, MonteCarloPricer
+from pricing import OptionPricingCalculator
+
 # -------------------------------
 # Streamlit Page Configuration
 # -------------------------------
@@ -14,66 +28,56 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Timing spans of this rerun, when profiling is turned on in the sidebar
+profiler = start_profiling()
+
 # -------------------------------
-# Option Pricing Calculator Class
+# Greek Surface
 # -------------------------------
-class OptionPricingCalculator:
+@st.cache_data(max_entries=32)
+@timed('Greek Surface Build')
+def greek_surface_figure(pricing_engine, surface_greek, strike_price, time_to_maturity, risk_free_rate,
+                         dividend_yield, surface_resolution, lattice_steps, american):
     """
-    A class to calculate European Call and Put option prices using the Black-Scholes model.
+    Builds the Greek surface figure over S in [80, 120] and sigma in [0.2, 0.8], cached by its inputs.
+
+    Returns the figure and whether the Black-Scholes surface stands in for a Greek the lattice
+    does not provide.
     """
+    count('Greek Surface Cache Misses')
+
+    # Create grids for S and sigma
+    S_range = np.linspace(80.0, 120.0, surface_resolution)
+    sigma_range = np.linspace(0.2, 0.8, surface_resolution)
+    S_grid, sigma_grid = np.meshgrid(S_range, sigma_range)
 
-    def __init__(self, S, K, T, r, sigma):
-        """
-        Initializes the calculator with market parameters.
-        
-        Parameters:
-        - S: Current stock price
-        - K: Strike price
-        - T: Time to maturity (in years)
-        - r: Risk-free interest rate
-        - sigma: Volatility of the underlying asset
-        """
-        self.S = S
-        self.K = K
-        self.T = T
-        self.r = r
-        self.sigma = sigma
-        self._calculate_d1_d2()
-
-    def _calculate_d1_d2(self):
-        """
-        Calculates the d1 and d2 parameters used in Black-Scholes formulas.
-        """
-        self.d1 = (np.log(self.S / self.K) + (self.r + 0.5 * self.sigma ** 2) * self.T) / \
-                  (self.sigma * np.sqrt(self.T))
-        self.d2 = self.d1 - self.sigma * np.sqrt(self.T)
-
-    def calculate_call_price(self):
-        """
-        Calculates the European Call option price.
-        """
-        call_price = self.S * norm.cdf(self.d1) - self.K * np.exp(-self.r * self.T) * norm.cdf(self.d2)
-        return call_price
-
-    def calculate_put_price(self):
-        """
-        Calculates the European Put option price.
-        """
-        put_price = self.K * np.exp(-self.r * self.T) * norm.cdf(-self.d2) - self.S * norm.cdf(-self.d1)
-        return put_price
-
-    def calculate_greeks(self):
-        """
-        Calculates the Delta and Gamma Greeks for both Call and Put options.
-        """
-        delta_call = norm.cdf(self.d1)
-        delta_put = delta_call - 1
-        gamma = norm.pdf(self.d1) / (self.S * self.sigma * np.sqrt(self.T))
-        return {
-            'Delta Call': delta_call,
-            'Delta Put': delta_put,
-            'Gamma': gamma
-        }
+    # Calculate the Greek over the whole grid in one vectorized pass
+    lattice_greek = 'Gamma Call' if surface_greek == 'Gamma' else surface_greek
+    fallback = pricing_engine != 'Black-Scholes' and not lattice_greek.startswith(('Delta', 'Gamma', 'Theta'))
+    if pricing_engine == 'Black-Scholes' or fallback:
+        surface = OptionPricingCalculator(S_grid, strike_price, time_to_maturity, risk_free_rate, sigma_grid,
+                                          dividend_yield).calculate_greeks()[surface_greek]
+    else:
+        # One lattice per volatility row, so the lattice surface is kept at SURFACE_RESOLUTION points
+        # a side and at most SURFACE_MAX_STEPS steps per lattice, whatever the resolution slider says
+        S_range = np.linspace(80.0, 120.0, SURFACE_RESOLUTION)
+        sigma_range = np.linspace(0.2, 0.8, SURFACE_RESOLUTION)
+        surface = lattice_surface(S_range, strike_price, time_to_maturity, risk_free_rate, sigma_range,
+                                  dividend_yield, lattice_greek, steps=lattice_steps, method=pricing_engine,
+                                  american=american)
+
+    fig_surface = go.Figure(data=[go.Surface(z=surface, x=S_range, y=sigma_range)])
+    fig_surface.update_layout(
+        title=f'{surface_greek} Surface',
+        scene=dict(
+            xaxis_title='Stock Price (S)',
+            yaxis_title='Volatility (σ)',
+            zaxis_title=surface_greek,
+        ),
+        autosize=True,
+        margin=dict(l=65, r=50, b=65, t=90)
+    )
+    return fig_surface, fallback
 
 # -------------------------------
 # Sidebar Inputs
@@ -86,28 +90,57 @@ with st.sidebar.form(key='parameters_form'):
     time_to_maturity = st.number_input("Time to Maturity (T in years)", value=1.0, min_value=0.01, step=0.01)
     risk_free_rate = st.number_input("Risk-Free Interest Rate (r)", value=0.05, min_value=0.0, step=0.01, format="%.4f")
     volatility = st.number_input("Volatility (σ)", value=0.2, min_value=0.01, step=0.01, format="%.4f")
+    dividend_yield = st.number_input("Dividend Yield (q)", value=0.0, min_value=0.0, step=0.01, format="%.4f")
+    pricing_engine = st.selectbox("Pricing Engine", ['Black-Scholes'] + LATTICE_METHODS)
+    american = st.checkbox("American Exercise (lattice engines)", value=True)
+    lattice_steps = st.number_input("Lattice Steps", value=500, min_value=2, max_value=10000, step=100)
+    surface_greek = st.selectbox("Surface Greek", ['Delta Call', 'Delta Put', 'Gamma', 'Vega', 'Theta Call',
+                                                   'Theta Put', 'Rho Call', 'Rho Put'])
+    surface_resolution = st.slider("Surface Resolution", min_value=25, max_value=500, value=200, step=25,
+                                   help=f"Lattice engines draw the Greek surface at {SURFACE_RESOLUTION} x "
+                                        f"{SURFACE_RESOLUTION}.")
 
     submit_button = st.form_submit_button(label='Calculate')
 
 # -------------------------------
 # Main Page Content
 # -------------------------------
-st.title("European Option Pricing Dashboard")
+st.title("Option Pricing Dashboard")
 
 if submit_button:
-    # Initialize the calculator
-    opc = OptionPricingCalculator(
-        S=current_price,
-        K=strike_price,
-        T=time_to_maturity,
-        r=risk_free_rate,
-        sigma=volatility
-    )
+    if pricing_engine != 'Black-Scholes':
+        # Too few steps for a low volatility give negative branching probabilities
+        pricing_steps = max(lattice_steps, min_lattice_steps(time_to_maturity, risk_free_rate, volatility,
+                                                             dividend_yield))
+        if pricing_steps > lattice_steps:
+            st.caption(f"Lattice steps raised to {pricing_steps:,} to keep the branching probabilities non-negative.")
 
-    # Calculate Prices and Greeks
-    call_price = opc.calculate_call_price()
-    put_price = opc.calculate_put_price()
-    greeks = opc.calculate_greeks()
+    # Initialize the calculator and calculate Prices and Greeks; the lattice is rolled back on construction
+    with span('Pricing', engine=pricing_engine):
+        if pricing_engine == 'Black-Scholes':
+            opc = OptionPricingCalculator(
+                S=current_price,
+                K=strike_price,
+                T=time_to_maturity,
+                r=risk_free_rate,
+                sigma=volatility,
+                q=dividend_yield
+            )
+        else:
+            opc = LatticePricingCalculator(
+                S=current_price,
+                K=strike_price,
+                T=time_to_maturity,
+                r=risk_free_rate,
+                sigma=volatility,
+                q=dividend_yield,
+                steps=pricing_steps,
+                method=pricing_engine,
+                american=american
+            )
+        call_price = opc.calculate_call_price()
+        put_price = opc.calculate_put_price()
+        greeks = opc.calculate_greeks()
 
     # Display Results
     col1, col2 = st.columns(2)
@@ -129,27 +162,138 @@ if submit_button:
     
     st.markdown("---")
     
-    # Additional Plot: Delta Surface
-    st.subheader("Delta Surface Plot")
+    # Additional Plot: Greek Surface
+    st.subheader(f"{surface_greek} Surface Plot")
     
-    # Create grids for S and sigma
-    S_range = np.linspace(80.0, 120.0, 25)
-    sigma_range = np.linspace(0.2, 0.8, 25)
-    S_grid, sigma_grid = np.meshgrid(S_range, sigma_range)
-    
-    # Calculate Delta over the grid
-    delta_calls = np.vectorize(lambda S, sigma: OptionPricingCalculator(S, strike_price, time_to_maturity, risk_free_rate, sigma).calculate_greeks()['Delta Call'])(S_grid, sigma_grid)
+    fig_surface, fallback = greek_surface_figure(pricing_engine, surface_greek, strike_price, time_to_maturity,
+                                                 risk_free_rate, dividend_yield, surface_resolution,
+                                                 lattice_steps, american)
+    if fallback:
+        st.caption(f"{surface_greek} is not available from the lattice; showing the Black-Scholes surface.")
+    elif pricing_engine != 'Black-Scholes':
+        st.caption(f"Lattice surfaces are drawn at a fixed {SURFACE_RESOLUTION} x {SURFACE_RESOLUTION} grid "
+                   f"(Surface Resolution applies to Black-Scholes) with at most {SURFACE_MAX_STEPS} steps per "
+                   f"volatility, so they can be redrawn interactively.")
     
-    fig_delta = go.Figure(data=[go.Surface(z=delta_calls, x=S_range, y=sigma_range)])
-    fig_delta.update_layout(
-        title='Call Option Delta Surface',
-        scene=dict(
-            xaxis_title='Stock Price (S)',
-            yaxis_title='Volatility (σ)',
-            zaxis_title='Delta',
-        ),
-        autosize=True,
-        margin=dict(l=65, r=50, b=65, t=90)
+    st.plotly_chart(fig_surface, use_container_width=True)
+
+# -------------------------------
+# Monte Carlo Pricing
+# -------------------------------
+st.markdown("---")
+st.header("Monte Carlo Pricing")
+
+with st.form(key='monte_carlo_form'):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        mc_payoff = st.selectbox("Payoff", PAYOFFS)
+        mc_option_type = st.selectbox("Option Type", ['Call', 'Put'])
+        mc_barrier_type = st.selectbox("Barrier Type", BARRIER_TYPES)
+        mc_barrier = st.number_input("Barrier Level", value=120.0, min_value=0.01, step=1.0)
+    with col2:
+        mc_paths = st.select_slider("Number of Paths", options=[10 ** k for k in range(4, 9)], value=10 ** 6,
+                                    format_func=lambda n: f"{n:,}")
+        mc_steps = st.number_input("Monitoring Dates", value=252, min_value=1, step=1)
+        mc_seed = st.number_input("Random Seed", value=42, min_value=0, step=1)
+    with col3:
+        mc_antithetic = st.checkbox("Antithetic Variates", value=True)
+        mc_control_variate = st.checkbox("Closed-Form Control Variate", value=True)
+        mc_workers = st.number_input("Worker Processes", value=1, min_value=1, max_value=os.cpu_count() or 1, step=1)
+
+    mc_button = st.form_submit_button(label='Run Simulation')
+
+if mc_button:
+    mc_pricer = MonteCarloPricer(
+        S=current_price,
+        K=strike_price,
+        T=time_to_maturity,
+        r=risk_free_rate,
+        sigma=volatility,
+        q=dividend_yield,
+        option_type=mc_option_type,
+        payoff=mc_payoff,
+        barrier=mc_barrier,
+        barrier_type=mc_barrier_type,
+        n_steps=mc_steps
     )
-    
-    st.plotly_chart(fig_delta, use_container_width=True)
+
+    # Stream the running estimate as each chunk of paths completes
+    progress = st.progress(0.0)
+    col1, col2, col3 = st.columns(3)
+    price_metric, error_metric, paths_metric = col1.empty(), col2.empty(), col3.empty()
+    for update in mc_pricer.stream(mc_paths, antithetic=mc_antithetic, control_variate=mc_control_variate,
+                                   seed=int(mc_seed), max_workers=int(mc_workers)):
+        progress.progress(update['Paths'] / mc_paths)
+        price_metric.metric("Monte Carlo Price", f"${update['Price']:.4f}")
+        error_metric.metric("Standard Error", f"{update['Std Error']:.5f}")
+        paths_metric.metric("Paths Simulated", f"{update['Paths']:,}")
+
+    if mc_payoff == 'European':
+        closed_form = OptionPricingCalculator(current_price, strike_price, time_to_maturity, risk_free_rate,
+                                              volatility, dividend_yield)
+        exact = closed_form.calculate_call_price() if mc_option_type == 'Call' else closed_form.calculate_put_price()
+        st.write(f"Closed-form price: ${exact:.4f}")
+
+# -------------------------------
+# Implied Volatility Surface
+# -------------------------------
+st.markdown("---")
+st.header("Implied Volatility Surface")
+
+chain_file = st.file_uploader(
+    "Upload an option chain CSV (strike, type, price or bid/ask, maturity in years or expiry date)", type="csv")
+
+chain = None
+if chain_file is not None:
+    try:
+        chain = load_chain(chain_file)
+    except ValueError as error:
+        st.error(str(error))
+
+if chain is not None:
+    # Solve every quote in one batch, using the sidebar stock price, rate and dividend yield
+    chain = solve_chain(chain, current_price, risk_free_rate, dividend_yield)
+    solved = chain[chain['Converged']]
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Quotes Solved", f"{len(solved):,} / {len(chain):,}")
+    col2.metric("Mean Iterations", f"{chain['Iterations'].mean():.1f}")
+    col3.metric("Failures", f"{len(chain) - len(solved):,}")
+    st.dataframe(chain)
+
+    if len(solved) >= 3:
+        try:
+            K_range, T_range, iv_grid = iv_surface(solved['Strike'], solved['Maturity'],
+                                                   solved['Implied Volatility'], resolution=surface_resolution)
+        except ValueError as error:
+            # A single expiry (or strike) is drawn as a smile (or term structure) line instead
+            st.caption(f"{error} Showing the implied volatility as lines instead.")
+            by_strike = solved['Strike'].nunique() > 1
+            x, group = ('Strike', 'Maturity') if by_strike else ('Maturity', 'Strike')
+            fig_iv = go.Figure([
+                go.Scatter(x=quotes[x], y=quotes['Implied Volatility'], mode='lines+markers', name=f'{group} {value:g}')
+                for value, quotes in solved.sort_values(x).groupby(group)
+            ])
+            fig_iv.update_layout(
+                title='Implied Volatility Smile' if by_strike else 'Implied Volatility Term Structure',
+                xaxis_title='Strike Price (K)' if by_strike else 'Time to Maturity (T)',
+                yaxis_title='Implied Volatility',
+            )
+        else:
+            fig_iv = go.Figure(data=[go.Surface(z=iv_grid, x=K_range, y=T_range)])
+            fig_iv.update_layout(
+                title='Implied Volatility Surface',
+                scene=dict(
+                    xaxis_title='Strike Price (K)',
+                    yaxis_title='Time to Maturity (T)',
+                    zaxis_title='Implied Volatility',
+                ),
+                autosize=True,
+                margin=dict(l=65, r=50, b=65, t=90)
+            )
+        st.plotly_chart(fig_iv, use_container_width=True)
+    else:
+        st.error("At least three solved quotes are needed to build a surface.")
+
+# Profiling panel, drawn last so it covers the whole rerun
+profiler_panel(profiler)
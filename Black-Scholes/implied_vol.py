@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+from pricing import OptionPricingCalculator
+
+
+# -------------------------------
+# Batch Implied Volatility Solver
+# -------------------------------
+def implied_volatility(price, S, K, T, r, q=0.0, is_call=True, tol=1e-8, max_iter=100,
+                       sigma_bounds=(1e-4, 5.0)):
+    """
+    Solves for Black-Scholes implied volatility over whole arrays of quotes at once.
+
+    Each point starts at the Manaster-Koehler guess and takes Newton steps on the
+    OptionPricingCalculator price, falling back to bisection whenever a step leaves the
+    bracket known to contain the root. Converged points are masked out of later iterations.
+    A point whose bracket collapses without matching the price (its volatility lies outside
+    sigma_bounds) is a failure: NaN and not converged, like one that runs out of iterations.
+
+    Parameters:
+    - price: Observed option prices
+    - S, K, T, r, q: Market parameters, broadcastable against price
+    - is_call: True for calls, False for puts (scalar or boolean array)
+    - tol: Absolute price tolerance
+    - max_iter: Maximum iterations per point
+    - sigma_bounds: Volatility search interval
+
+    Returns a dict with 'Implied Volatility' (NaN where unsolved), 'Iterations' and 'Converged'.
+    """
+    price, S, K, T, r, q, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in (price, S, K, T, r, q)), np.asarray(is_call, dtype=bool))
+    shape = price.shape
+    price, S, K, T, r, q, is_call = (x.ravel() for x in (price, S, K, T, r, q, is_call))
+
+    n = price.size
+    sigma = np.full(n, np.nan)
+    iterations = np.zeros(n, dtype=np.int64)
+    converged = np.zeros(n, dtype=bool)
+
+    # Quotes outside the no-arbitrage bounds have no implied volatility
+    spot = S * np.exp(-q * T)
+    strike = K * np.exp(-r * T)
+    lower = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    upper = np.where(is_call, spot, strike)
+    valid = np.isfinite(price) & (T > 0) & (price > lower) & (price < upper)
+
+    active = np.flatnonzero(valid)
+    lo = np.full(active.size, sigma_bounds[0])
+    hi = np.full(active.size, sigma_bounds[1])
+    guess = np.sqrt(2 * np.abs(np.log(S[active] / K[active]) + (r[active] - q[active]) * T[active]) / T[active])
+    vol = np.clip(np.where(guess > 0, guess, 0.2), lo, hi)
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        iterations[active] += 1
+        opc = OptionPricingCalculator(S[active], K[active], T[active], r[active], vol, q[active])
+        model = np.where(is_call[active], opc.calculate_call_price(), opc.calculate_put_price())
+        diff = model - price[active]
+
+        # Price is increasing in sigma, so the sign of diff tightens the bracket
+        hi = np.where(diff > 0, vol, hi)
+        lo = np.where(diff < 0, vol, lo)
+
+        solved = np.abs(diff) < tol
+        sigma[active[solved]] = vol[solved]
+        converged[active[solved]] = True
+        done = solved | (hi - lo < 1e-12)
+
+        vega = opc.calculate_greeks()['Vega']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = vol - diff / vega
+        bisect = ~np.isfinite(step) | (step <= lo) | (step >= hi)
+        step = np.where(bisect, 0.5 * (lo + hi), step)
+
+        keep = ~done
+        active, lo, hi, vol = active[keep], lo[keep], hi[keep], step[keep]
+
+    return {
+        'Implied Volatility': sigma.reshape(shape),
+        'Iterations': iterations.reshape(shape),
+        'Converged': converged.reshape(shape),
+    }
+
+
+# -------------------------------
+# Option Chain Loading
+# -------------------------------
+def load_chain(source, valuation_date=None):
+    """
+    Loads an option chain CSV into a DataFrame with Strike, Maturity, Price and Type columns.
+
+    Column names are case-insensitive. The file needs a strike, a type (call/put or C/P),
+    a price or a bid and ask (the mid is used), and a maturity in years or an expiry date.
+    An optional underlying column overrides the dashboard's stock price per row. Raises
+    ValueError naming the missing columns.
+    """
+    raw = pd.read_csv(source)
+    raw.columns = [column.strip().lower() for column in raw.columns]
+    missing = [name for name, present in (
+        ('strike', 'strike' in raw),
+        ('type', 'type' in raw),
+        ('price or bid and ask', 'price' in raw or ('bid' in raw and 'ask' in raw)),
+        ('maturity or expiry', 'maturity' in raw or 'expiry' in raw),
+    ) if not present]
+    if missing:
+        raise ValueError(f"Option chain is missing column(s): {', '.join(missing)}")
+
+    chain = pd.DataFrame({'Strike': raw['strike'].astype(float)})
+    chain['Type'] = raw['type'].astype(str).str.strip().str[0].str.upper().map({'C': 'Call', 'P': 'Put'})
+    if 'price' in raw:
+        chain['Price'] = raw['price'].astype(float)
+    else:
+        chain['Price'] = (raw['bid'].astype(float) + raw['ask'].astype(float)) / 2
+    if 'maturity' in raw:
+        chain['Maturity'] = raw['maturity'].astype(float)
+    else:
+        today = pd.Timestamp(valuation_date if valuation_date is not None else pd.Timestamp.today().normalize())
+        chain['Maturity'] = (pd.to_datetime(raw['expiry']) - today).dt.days / 365.0
+    if 'underlying' in raw:
+        chain['Underlying'] = raw['underlying'].astype(float)
+    return chain
+
+
+def solve_chain(chain, S, r, q=0.0, **kwargs):
+    """
+    Adds Implied Volatility, Iterations and Converged columns to a chain from load_chain().
+    """
+    result = implied_volatility(chain['Price'].to_numpy(), chain.get('Underlying', S), chain['Strike'].to_numpy(),
+                                chain['Maturity'].to_numpy(), r, q, (chain['Type'] == 'Call').to_numpy(), **kwargs)
+    return chain.assign(**result)
+
+
+# -------------------------------
+# Implied Volatility Surface
+# -------------------------------
+def iv_surface(strikes, maturities, vols, resolution=50):
+    """
+    Interpolates scattered implied volatilities onto a regular strike x maturity grid.
+
+    Returns (strike_range, maturity_range, grid) ready for go.Surface; grid cells outside
+    the convex hull of the quotes are NaN. Raises ValueError when the quotes do not span an
+    area, e.g. a single expiry or a single strike.
+    """
+    from scipy.interpolate import griddata
+    from scipy.spatial import QhullError
+
+    strikes, maturities, vols = (np.asarray(x, dtype=np.float64) for x in (strikes, maturities, vols))
+    ok = np.isfinite(vols)
+    if len(np.unique(strikes[ok])) < 2 or len(np.unique(maturities[ok])) < 2:
+        raise ValueError("A surface needs quotes at two or more strikes and two or more maturities.")
+    strike_range = np.linspace(strikes[ok].min(), strikes[ok].max(), resolution)
+    maturity_range = np.linspace(maturities[ok].min(), maturities[ok].max(), resolution)
+    K_grid, T_grid = np.meshgrid(strike_range, maturity_range)
+    try:
+        grid = griddata((strikes[ok], maturities[ok]), vols[ok], (K_grid, T_grid), method='linear')
+    except QhullError:
+        raise ValueError("The quotes lie on a line, so they do not span a surface.") from None
+    return strike_range, maturity_range, grid
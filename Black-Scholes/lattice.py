@@ -0,0 +1,194 @@
+import numpy as np
+
+
+LATTICE_METHODS = ['Binomial (CRR)', 'Trinomial']
+
+# Grid size and steps of each lattice behind a Greek surface; the surface rolls back one lattice
+# per volatility, so 50 x 50 already takes seconds where 25 x 25 redraws in under one
+SURFACE_RESOLUTION = 25
+SURFACE_MAX_STEPS = 200
+
+
+def min_lattice_steps(T, r, sigma, q=0.0):
+    """
+    Returns the fewest steps for which the branching probabilities are non-negative.
+
+    CRR needs |r - q| * dt <= sigma * sqrt(dt), i.e. steps >= T * ((r - q) / sigma)**2; the
+    trinomial lattice only needs half as many, so the CRR bound covers both methods.
+    """
+    return max(int(np.ceil(T * ((r - q) / sigma) ** 2)) + 1, 3)
+
+
+# -------------------------------
+# Lattice Pricing Calculator Class
+# -------------------------------
+class LatticePricingCalculator:
+    """
+    A class to calculate European or American Call and Put option prices on a recombining
+    Cox-Ross-Rubinstein binomial or Boyle trinomial lattice.
+
+    K may be an array: every strike, and both calls and puts, are rolled back through the same
+    lattice together. Backward induction works in place on one row of nodes per option, so
+    memory is O(steps) per strike. Delta, Gamma and Theta are read off the first tree nodes.
+    """
+
+    def __init__(self, S, K, T, r, sigma, q=0.0, steps=500, method='Binomial (CRR)', american=True):
+        """
+        Initializes the calculator and rolls the lattice back.
+
+        Parameters:
+        - S: Current stock price
+        - K: Strike price (scalar or 1D array)
+        - T: Time to maturity (in years)
+        - r: Risk-free interest rate
+        - sigma: Volatility of the underlying asset
+        - q: Continuous dividend yield
+        - steps: Number of time steps in the lattice
+        - method: One of LATTICE_METHODS
+        - american: Allow early exercise at every node
+        """
+        if method not in LATTICE_METHODS:
+            raise ValueError(f"method must be one of {LATTICE_METHODS}")
+        self.S = float(S)
+        self.K = np.asarray(K, dtype=np.float64)
+        self.T = float(T)
+        self.r = float(r)
+        self.sigma = float(sigma)
+        self.q = float(q)
+        # The binomial Greeks read the nodes of step 2
+        self.steps = max(int(steps), 3)
+        self.method = method
+        self.american = american
+        self._roll_back()
+
+    def _parameters(self):
+        """
+        Returns the up factor, the node-to-node branching probabilities (up first) discounted
+        by one step, and the exponent stride between neighbouring nodes.
+        """
+        dt = self.T / self.steps
+        growth = np.exp((self.r - self.q) * dt)
+        discount = np.exp(-self.r * dt)
+        if self.method == 'Binomial (CRR)':
+            u = np.exp(self.sigma * np.sqrt(dt))
+            p_up = (growth - 1 / u) / (u - 1 / u)
+            return u, (discount * p_up, discount * (1 - p_up)), 2
+        u = np.exp(self.sigma * np.sqrt(2 * dt))
+        half_up = np.exp(self.sigma * np.sqrt(dt / 2))
+        p_up = ((np.sqrt(growth) - 1 / half_up) / (half_up - 1 / half_up)) ** 2
+        p_down = ((half_up - np.sqrt(growth)) / (half_up - 1 / half_up)) ** 2
+        return u, (discount * p_up, discount * (1 - p_up - p_down), discount * p_down), 1
+
+    def _roll_back(self):
+        u, probabilities, stride = self._parameters()
+        steps, branches = self.steps, len(probabilities)
+        if min(probabilities) < 0:
+            raise ValueError("Lattice probabilities are negative; increase the number of steps.")
+
+        # Node prices at step i are S * u**k for k = -i ... i, every `stride`-th power
+        powers = self.S * u ** np.arange(-steps, steps + 1, dtype=np.float64)
+
+        def prices(i):
+            return powers[steps - i: steps + i + 1: stride]
+
+        # Rows 0..n-1 hold calls, rows n..2n-1 hold puts
+        n = self.K.size
+        strikes = np.tile(self.K.reshape(-1, 1), (2, 1))
+        sign = np.repeat([[1.0], [-1.0]], n, axis=0)
+        values = np.maximum(sign * (prices(steps) - strikes), 0.0)
+        scratch = np.empty_like(values)
+
+        saved = {}
+        for i in range(steps - 1, -1, -1):
+            width = i * (branches - 1) + 1
+            current = scratch[:, :width]
+            # Node j at step i branches to nodes j .. j + branches - 1 at step i + 1, lowest first
+            np.multiply(values[:, :width], probabilities[-1], out=current)
+            for b in range(1, branches):
+                current += probabilities[-1 - b] * values[:, b:b + width]
+            if self.american:
+                np.maximum(current, sign * (prices(i) - strikes), out=current)
+            if i <= 2:
+                saved[i] = (prices(i).copy(), current.copy())
+            values, scratch = scratch, values
+
+        self._saved = saved
+        self._n = n
+        self._dt = self.T / steps
+        self._branches = branches
+
+    def _split(self, array):
+        """Splits a result over call and put rows, returning scalars for a scalar strike."""
+        call, put = array[:self._n], array[self._n:]
+        if self.K.ndim == 0:
+            return call[0], put[0]
+        return call, put
+
+    def calculate_call_price(self):
+        """
+        Calculates the Call option price.
+        """
+        return self._split(self._saved[0][1][:, 0])[0]
+
+    def calculate_put_price(self):
+        """
+        Calculates the Put option price.
+        """
+        return self._split(self._saved[0][1][:, 0])[1]
+
+    def calculate_greeks(self):
+        """
+        Calculates Delta, Gamma and Theta for both Call and Put options from the lattice nodes.
+
+        Theta is per year.
+        """
+        value = self._saved[0][1][:, 0]
+        if self._branches == 2:
+            # Binomial: delta from step 1, gamma from step 2, theta from the middle node of step 2
+            S1, V1 = self._saved[1]
+            S2, V2 = self._saved[2]
+            delta = (V1[:, 1] - V1[:, 0]) / (S1[1] - S1[0])
+            theta = (V2[:, 1] - value) / (2 * self._dt)
+        else:
+            # Trinomial: everything from the three nodes of step 1
+            S2, V2 = self._saved[1]
+            delta = (V2[:, 2] - V2[:, 0]) / (S2[2] - S2[0])
+            theta = (V2[:, 1] - value) / self._dt
+        gamma = ((V2[:, 2] - V2[:, 1]) / (S2[2] - S2[1]) - (V2[:, 1] - V2[:, 0]) / (S2[1] - S2[0])) / \
+                (0.5 * (S2[2] - S2[0]))
+
+        delta_call, delta_put = self._split(delta)
+        gamma_call, gamma_put = self._split(gamma)
+        theta_call, theta_put = self._split(theta)
+        return {
+            'Delta Call': delta_call,
+            'Delta Put': delta_put,
+            'Gamma Call': gamma_call,
+            'Gamma Put': gamma_put,
+            'Theta Call': theta_call,
+            'Theta Put': theta_put,
+        }
+
+
+# -------------------------------
+# Lattice Greek Surface
+# -------------------------------
+def lattice_surface(S_range, K, T, r, sigma_range, q=0.0, greek='Delta Call', steps=500,
+                    max_steps=SURFACE_MAX_STEPS, **kwargs):
+    """
+    Calculates a lattice Greek over an S x sigma grid with one lattice per volatility.
+
+    Option values are homogeneous of degree one in (S, K), so every stock price in a row is
+    priced as strike K / S on a lattice with unit spot, and the results are rescaled.
+    Each lattice uses min(steps, max_steps) steps, raised where a low volatility needs more
+    for non-negative probabilities. Returns an array of shape (len(sigma_range), len(S_range)).
+    """
+    S_range = np.asarray(S_range, dtype=np.float64)
+    scale = {'Delta': 1.0, 'Gamma': 1.0 / S_range, 'Theta': S_range}[greek.split()[0]]
+    steps = min(int(steps), max_steps)
+    return np.array([
+        LatticePricingCalculator(1.0, K / S_range, T, r, sigma, q,
+                                 steps=max(steps, min_lattice_steps(T, r, sigma, q)),
+                                 **kwargs).calculate_greeks()[greek] * scale
+        for sigma in sigma_range
+    ])
@@ -0,0 +1,227 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pricing import OptionPricingCalculator
+
+
+PAYOFFS = ['European', 'Asian', 'Barrier', 'Lookback']
+BARRIER_TYPES = ['up-and-out', 'down-and-out', 'up-and-in', 'down-and-in']
+
+# Upper bound on simulated prices held in memory per chunk (about 32 MB of float64)
+CHUNK_ELEMENTS = 4_000_000
+
+
+# -------------------------------
+# Payoffs
+# -------------------------------
+def _payoff(paths, params):
+    """
+    Undiscounted payoff of each simulated path.
+
+    paths has one row per path and one column per monitoring date, the last being maturity.
+    """
+    S_T = paths[:, -1]
+    sign = 1.0 if params['option_type'] == 'Call' else -1.0
+    payoff = params['payoff']
+
+    if payoff == 'Lookback':
+        # Floating strike: buy at the path minimum (call) or sell at the path maximum (put)
+        extreme = paths.min(axis=1) if sign > 0 else paths.max(axis=1)
+        return sign * (S_T - extreme)
+
+    if payoff == 'Asian':
+        underlying = paths.mean(axis=1)
+    else:
+        underlying = S_T
+    value = np.maximum(sign * (underlying - params['K']), 0.0)
+
+    if payoff == 'Barrier':
+        barrier_type = params['barrier_type']
+        if barrier_type.startswith('up'):
+            crossed = paths.max(axis=1) >= params['barrier']
+        else:
+            crossed = paths.min(axis=1) <= params['barrier']
+        alive = ~crossed if barrier_type.endswith('out') else crossed
+        value *= alive
+    return value
+
+
+def _control(paths, params):
+    """
+    Undiscounted control variate of each path, whose discounted mean is known in closed form:
+    the terminal stock price for European options, the matching vanilla option otherwise.
+    """
+    S_T = paths[:, -1]
+    if params['payoff'] == 'European':
+        return S_T.copy()
+    sign = 1.0 if params['option_type'] == 'Call' else -1.0
+    return np.maximum(sign * (S_T - params['K']), 0.0)
+
+
+def control_mean(params):
+    """Closed-form discounted expectation of the control variate."""
+    if params['payoff'] == 'European':
+        return params['S'] * np.exp(-params['q'] * params['T'])
+    opc = OptionPricingCalculator(params['S'], params['K'], params['T'], params['r'], params['sigma'], params['q'])
+    return opc.calculate_call_price() if params['option_type'] == 'Call' else opc.calculate_put_price()
+
+
+# -------------------------------
+# Chunk Simulation
+# -------------------------------
+def _simulate_paths(Z, params):
+    """Turn a block of standard normals into GBM price paths, in place."""
+    dt = params['T'] / Z.shape[1]
+    Z *= params['sigma'] * np.sqrt(dt)
+    Z += (params['r'] - params['q'] - 0.5 * params['sigma'] ** 2) * dt
+    np.cumsum(Z, axis=1, out=Z)
+    np.exp(Z, out=Z)
+    Z *= params['S']
+    return Z
+
+
+def _moments(samples):
+    """(count, mean, M2) of the rows of samples, where M2 is the matrix of summed co-deviations."""
+    mean = samples.mean(axis=0)
+    centered = samples - mean
+    return len(samples), mean, centered.T @ centered
+
+
+def _merge(a, b):
+    """Combine two (count, mean, M2) summaries (Chan et al. parallel update)."""
+    n_a, mean_a, M2_a = a
+    n_b, mean_b, M2_b = b
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * (n_b / n), M2_a + M2_b + np.outer(delta, delta) * (n_a * n_b / n)
+
+
+def simulate_chunk(params, seed, n_paths, antithetic=True):
+    """
+    Simulate one chunk of paths and return the moments of (discounted payoff, discounted control).
+
+    With antithetic sampling each sample is the average over a path and its mirror image,
+    so n_paths paths give ceil(n_paths / 2) independent samples; an odd chunk simulates one
+    extra mirror path rather than leaving its last path without a partner.
+    """
+    rng = np.random.default_rng(seed)
+    discount = np.exp(-params['r'] * params['T'])
+    n_draws = (n_paths + 1) // 2 if antithetic else n_paths
+    Z = rng.standard_normal((n_draws, params['n_steps']))
+
+    if antithetic:
+        mirror = _simulate_paths(-Z, params)
+        paths = _simulate_paths(Z, params)
+        payoff = 0.5 * (_payoff(paths, params) + _payoff(mirror, params))
+        control = 0.5 * (_control(paths, params) + _control(mirror, params))
+    else:
+        paths = _simulate_paths(Z, params)
+        payoff = _payoff(paths, params)
+        control = _control(paths, params)
+
+    return _moments(np.column_stack((payoff * discount, control * discount)))
+
+
+# -------------------------------
+# Monte Carlo Pricer Class
+# -------------------------------
+class MonteCarloPricer:
+    """
+    A Monte Carlo pricer for European and path-dependent options under Black-Scholes dynamics.
+
+    Paths are simulated in fixed-size chunks, so memory stays flat however many paths are
+    requested, and every chunk draws from its own child of one SeedSequence, so results are
+    reproducible for a given seed regardless of how many worker processes are used.
+    """
+
+    def __init__(self, S, K, T, r, sigma, q=0.0, option_type='Call', payoff='European',
+                 barrier=None, barrier_type='up-and-out', n_steps=252):
+        """
+        Initializes the pricer with market and contract parameters.
+
+        Parameters:
+        - S, K, T, r, sigma, q: As for OptionPricingCalculator
+        - option_type: 'Call' or 'Put'
+        - payoff: One of PAYOFFS; Lookback options are floating strike and ignore K
+        - barrier, barrier_type: Barrier level and one of BARRIER_TYPES, for Barrier options
+        - n_steps: Monitoring dates per path (European options only need the last one)
+        """
+        if payoff not in PAYOFFS:
+            raise ValueError(f"payoff must be one of {PAYOFFS}")
+        if payoff == 'Barrier' and (barrier is None or barrier_type not in BARRIER_TYPES):
+            raise ValueError(f"Barrier options need a barrier level and a barrier_type in {BARRIER_TYPES}")
+        self.params = {
+            'S': float(S), 'K': float(K), 'T': float(T), 'r': float(r), 'sigma': float(sigma), 'q': float(q),
+            'option_type': option_type, 'payoff': payoff, 'barrier': barrier, 'barrier_type': barrier_type,
+            'n_steps': 1 if payoff == 'European' else int(n_steps),
+        }
+
+    def stream(self, n_paths, chunk_size=None, antithetic=True, control_variate=True, seed=None, max_workers=1):
+        """
+        Simulates n_paths paths chunk by chunk, yielding the running estimate after each chunk.
+
+        Each update is a dict with 'Paths', 'Price' and 'Std Error'.
+        """
+        if chunk_size is None:
+            chunk_size = max(1_000, CHUNK_ELEMENTS // self.params['n_steps'])
+        if antithetic:
+            chunk_size += chunk_size % 2
+        sizes = [chunk_size] * (n_paths // chunk_size)
+        if n_paths % chunk_size:
+            sizes.append(n_paths % chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        known = control_mean(self.params) if control_variate else None
+
+        chunks = ((self.params, chunk_seed, size, antithetic) for chunk_seed, size in zip(seeds, sizes))
+        if max_workers is None or max_workers > 1:
+            yield from self._accumulate(self._run_pool(chunks, max_workers or os.cpu_count()), sizes, known)
+        else:
+            yield from self._accumulate((simulate_chunk(*chunk) for chunk in chunks), sizes, known)
+
+    @staticmethod
+    def _run_pool(chunks, max_workers):
+        """
+        Yields the summaries of chunks in order, keeping at most 2 * max_workers chunks in flight.
+
+        If the consumer stops early (a Streamlit rerun abandoning the stream), queued chunks are
+        cancelled and the pool is shut down without waiting for the running ones.
+        """
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(simulate_chunk, *chunk))
+                if len(pending) >= 2 * max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            pool.shutdown(wait=not pending, cancel_futures=True)
+
+    def _accumulate(self, summaries, sizes, known):
+        total = None
+        for paths, summary in zip(np.cumsum(sizes), summaries):
+            total = summary if total is None else _merge(total, summary)
+            n, mean, M2 = total
+            cov = M2 / max(n - 1, 1)
+            if known is not None and cov[1, 1] > 0:
+                # Optimal control-variate coefficient and the variance left after the adjustment
+                beta = cov[0, 1] / cov[1, 1]
+                price = mean[0] - beta * (mean[1] - known)
+                variance = cov[0, 0] - beta * cov[0, 1]
+            else:
+                price = mean[0]
+                variance = cov[0, 0]
+            yield {'Paths': int(paths), 'Price': price, 'Std Error': np.sqrt(max(variance, 0.0) / n)}
+
+    def price(self, n_paths, **kwargs):
+        """
+        Runs the full simulation and returns the final estimate from stream().
+        """
+        result = None
+        for result in self.stream(n_paths, **kwargs):
+            pass
+        return result
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+# -------------------------------
+# Option Pricing Calculator Class
+# -------------------------------
+class OptionPricingCalculator:
+    """
+    A class to calculate European Call and Put option prices using the Black-Scholes model.
+
+    Every parameter may be a scalar or a NumPy array; arrays are broadcast against each other,
+    so a single calculator prices a whole option chain or surface grid in one pass.
+    """
+
+    def __init__(self, S, K, T, r, sigma, q=0.0):
+        """
+        Initializes the calculator with market parameters.
+
+        Parameters:
+        - S: Current stock price
+        - K: Strike price
+        - T: Time to maturity (in years)
+        - r: Risk-free interest rate
+        - sigma: Volatility of the underlying asset
+        - q: Continuous dividend yield
+        """
+        self.S = S
+        self.K = K
+        self.T = T
+        self.r = r
+        self.sigma = sigma
+        self.q = q
+        self._calculate_d1_d2()
+
+    def _calculate_d1_d2(self):
+        """
+        Calculates the d1 and d2 parameters used in Black-Scholes formulas, together with
+        the CDF/PDF values and discount factors that every price and Greek reuses.
+        """
+        # scipy is imported on first use so the app starts without it
+        from scipy.special import ndtr
+
+        sqrt_T = np.sqrt(self.T)
+        self.d1 = (np.log(self.S / self.K) + (self.r - self.q + 0.5 * self.sigma ** 2) * self.T) / \
+                  (self.sigma * sqrt_T)
+        self.d2 = self.d1 - self.sigma * sqrt_T
+
+        self._sqrt_T = sqrt_T
+        self._cdf_d1 = ndtr(self.d1)
+        self._cdf_d2 = ndtr(self.d2)
+        self._cdf_neg_d1 = ndtr(-self.d1)
+        self._cdf_neg_d2 = ndtr(-self.d2)
+        self._pdf_d1 = np.exp(-self.d1 ** 2 / 2.0) / np.sqrt(2 * np.pi)
+        self._discount = np.exp(-self.r * self.T)
+        self._dividend_discount = np.exp(-self.q * self.T)
+
+    def calculate_call_price(self):
+        """
+        Calculates the European Call option price.
+        """
+        call_price = self.S * self._dividend_discount * self._cdf_d1 - self.K * self._discount * self._cdf_d2
+        return call_price
+
+    def calculate_put_price(self):
+        """
+        Calculates the European Put option price.
+        """
+        put_price = self.K * self._discount * self._cdf_neg_d2 - self.S * self._dividend_discount * self._cdf_neg_d1
+        return put_price
+
+    def calculate_greeks(self):
+        """
+        Calculates Delta, Gamma, Vega, Theta and Rho for both Call and Put options.
+
+        Vega and Rho are per unit change in sigma and r; Theta is per year.
+        """
+        spot = self.S * self._dividend_discount
+        strike = self.K * self._discount
+        delta_call = self._dividend_discount * self._cdf_d1
+        delta_put = delta_call - self._dividend_discount
+        gamma = self._dividend_discount * self._pdf_d1 / (self.S * self.sigma * self._sqrt_T)
+        vega = spot * self._pdf_d1 * self._sqrt_T
+        decay = -spot * self._pdf_d1 * self.sigma / (2 * self._sqrt_T)
+        theta_call = decay - self.r * strike * self._cdf_d2 + self.q * spot * self._cdf_d1
+        theta_put = decay + self.r * strike * self._cdf_neg_d2 - self.q * spot * self._cdf_neg_d1
+        rho_call = strike * self.T * self._cdf_d2
+        rho_put = -strike * self.T * self._cdf_neg_d2
+        return {
+            'Delta Call': delta_call,
+            'Delta Put': delta_put,
+            'Gamma': gamma,
+            'Vega': vega,
+            'Theta Call': theta_call,
+            'Theta Put': theta_put,
+            'Rho Call': rho_call,
+            'Rho Put': rho_put,
+        }
+
+    def calculate_all(self):
+        """
+        Calculates Call and Put prices and all Greeks in one pass.
+        """
+        return {
+            'Call Price': self.calculate_call_price(),
+            'Put Price': self.calculate_put_price(),
+            **self.calculate_greeks(),
+        }
@@ -1,8 +1,89 @@
 import streamlit as st
-import yfinance as yf
+import pandas as pd
+import datetime as dt
+import sys
+from functools import partial
+from pathlib import Path
 
-# Tab structure for different features
-tab1, tab2, tab3 = st.tabs(["Stock Data", "Company Financials", "Valuation"])
+# Shared modules live at the repository root
+ROOT = str(Path(__file__).resolve().parents[1])
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from common.fetch import NoDataError, TokenBucket, fetch_many, new_session
+from common.fundamentals_store import FundamentalsStore
+from common.instrumentation import bind_profiler, count, profiler_panel, start_profiling, timed
+from common.price_store import PriceStore, combine_bars
+from common.providers import OHLCV_COLUMNS, YahooProvider, fetch_fundamentals, fetch_statement
+from export import EXPORT_FORMATS, export_frame, export_zip
+from valuation import VALUATION_MODELS, graham_stock_price, rank_universe
+
+
+# Timing spans of this rerun, when profiling is turned on in the sidebar
+profiler = start_profiling()
+
+# HTTP session and Yahoo rate limit shared by every session of this app
+@st.cache_resource
+def http_session():
+    return new_session()
+
+@st.cache_resource
+def rate_limiter():
+    return TokenBucket(rate=5, capacity=10)
+
+# Price store shared by every session and app on this machine
+@st.cache_resource
+def price_store():
+    return PriceStore(provider=YahooProvider(session=http_session(), limiter=rate_limiter()))
+
+# Fundamentals store shared the same way; queries read it from disk, only refreshes go to Yahoo
+@st.cache_resource
+def fundamentals_store():
+    return FundamentalsStore(fetch=lambda ticker: fetch_fundamentals(ticker, session=http_session(),
+                                                                     limiter=rate_limiter()))
+
+# Years of history for each preset date range; "All" starts where Yahoo's "max" period does
+DATE_RANGES = {"1 Year": 1, "3 Years": 3, "5 Years": 5}
+ALL_START = dt.date(1900, 1, 1)
+
+# Function to download the bars of several tickers, memoized by its inputs
+@st.cache_data(ttl=3600, show_spinner="Fetching stock data...")
+@timed('Fetch Stock Data')
+def load_stock_data(ticker_list, interval, start, end):
+    """Return the combined bars with start <= date < end and the fetch report, read from the local store if possible."""
+    count('Stock Data Cache Misses')
+    def fetch_bars(ticker):
+        bars = price_store().get(ticker, start, end, interval)
+        if bars.empty:
+            raise NoDataError("No price data found")
+        return bars
+
+    report = fetch_many(ticker_list, fetch_bars)
+    df = combine_bars({ticker: report.results.get(ticker, pd.DataFrame(columns=OHLCV_COLUMNS))
+                       for ticker in ticker_list})
+    return df, report
+
+# File name of each yf.Ticker statement in exports
+STATEMENT_FILES = {'balance_sheet': 'balance_sheet', 'financials': 'income_statement'}
+
+# Function to download the balance sheet and income statement of several tickers, memoized by ticker
+@st.cache_data(ttl=3600, show_spinner="Fetching financial statements...")
+@timed('Fetch Financials')
+def load_financials(financial_tickers):
+    count('Financials Cache Misses')
+    return fetch_many(
+        [(ticker, statement) for ticker in financial_tickers for statement in ('balance_sheet', 'financials')],
+        lambda key: fetch_statement(*key, session=http_session(), limiter=rate_limiter()),
+    )
+
+# Function to show the tickers that could not be fetched
+def show_fetch_errors(report):
+    if not report.ok:
+        st.warning(f"{len(report.errors)} request(s) failed; showing partial results.")
+        st.dataframe(report.error_frame())
+
+# Tab structure for different features; only the open tab does any work on a rerun
+tab1, tab2, tab3 = st.tabs(["Stock Data", "Company Financials", "Valuation"], key="tab", on_change="rerun")
 
 # First tab: Stock Data Download
 with tab1:
@@ -12,60 +93,110 @@ with tab1:
     tickers = st.text_input("Enter ticker symbols (e.g., AAPL MSFT)", "AAPL")
     interval = st.selectbox("Select interval", ['1d', '1wk', '1mo', '3mo'])
     date_option = st.selectbox("Select Date Range", ["1 Year", "3 Years", "5 Years", "All", "Custom"])
+    stock_format = st.selectbox("Export format", list(EXPORT_FORMATS), key="stock_format")
     
-    # Automatically download stock data based on user input
-    df = yf.download(tickers, period="5y", interval=interval)
-    
-    if not df.empty:
-        st.write("Stock Data:")
-        st.dataframe(df)
-        csv = df.to_csv().encode('utf-8')
-        st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name=f'{tickers.replace(" ", "_")}_stock_data.csv',
-            mime='text/csv',
-        )
+    if date_option == "Custom":
+        col1, col2 = st.columns(2)
+        start = col1.date_input("Start date", dt.date.today() - dt.timedelta(days=365))
+        end = col2.date_input("End date", dt.date.today())
     else:
-        st.error("No data found for the selected parameters.")
+        end = dt.date.today()
+        start = ALL_START if date_option == "All" else end - dt.timedelta(days=365 * DATE_RANGES[date_option])
+
+    # Download only while this tab is open; results are memoized by the inputs above
+    if tab1.open:
+        stock_query = (tuple(tickers.split()), interval, start, end + dt.timedelta(days=1))
+        df, report = load_stock_data(*stock_query)
+        show_fetch_errors(report)
+        if not report.ok:
+            # Failed requests are retried on the next rerun rather than memoized
+            load_stock_data.clear(*stock_query)
+
+        if not df.empty:
+            st.write("Stock Data:")
+            st.dataframe(df)
+
+            # Files are only written when a download is requested
+            extension, mime = EXPORT_FORMATS[stock_format]
+            st.download_button(
+                label=f"Download {stock_format}",
+                data=bind_profiler(partial(export_frame, df, stock_format)),
+                file_name=f'{tickers.replace(" ", "_")}_stock_data.{extension}',
+                mime=mime,
+                on_click="ignore",
+            )
+            if len(report.results) > 1:
+                st.download_button(
+                    label="Download Zip (one file per ticker)",
+                    data=bind_profiler(partial(export_zip, report.results, stock_format)),
+                    file_name=f'{tickers.replace(" ", "_")}_stock_data.zip',
+                    mime='application/zip',
+                    on_click="ignore",
+                )
+        else:
+            st.error("No data found for the selected parameters.")
 
 # Second tab: Company Financials Download
 with tab2:
     st.title("Download Company Financials")
 
     financial_ticker = st.text_input("Enter company ticker for financials (e.g., AAPL, MSFT)", "AAPL", key="financials")
+    financial_tickers = financial_ticker.replace(",", " ").split()
+    statement_format = st.selectbox("Export format", list(EXPORT_FORMATS), key="statement_format")
+    extension, mime = EXPORT_FORMATS[statement_format]
     
-    ticker_obj = yf.Ticker(financial_ticker)
-    
-    # Balance Sheet
-    balance_sheet = ticker_obj.balance_sheet
-    if not balance_sheet.empty:
-        st.subheader("Balance Sheet")
-        st.dataframe(balance_sheet)
-        balance_csv = balance_sheet.to_csv().encode('utf-8')
-        st.download_button(
-            label="Download Balance Sheet CSV",
-            data=balance_csv,
-            file_name=f'{financial_ticker}_balance_sheet.csv',
-            mime='text/csv',
-        )
-    else:
-        st.error("Balance sheet not available.")
-    
-    # Income Statement
-    income_statement = ticker_obj.financials
-    if not income_statement.empty:
-        st.subheader("Income Statement")
-        st.dataframe(income_statement)
-        income_csv = income_statement.to_csv().encode('utf-8')
-        st.download_button(
-            label="Download Income Statement CSV",
-            data=income_csv,
-            file_name=f'{financial_ticker}_income_statement.csv',
-            mime='text/csv',
-        )
-    else:
-        st.error("Income statement not available.")
+    # Fetch every statement of every ticker concurrently, only while this tab is open
+    report = load_financials(tuple(financial_tickers)) if tab2.open else None
+    if report is not None:
+        show_fetch_errors(report)
+        if not report.ok:
+            load_financials.clear(tuple(financial_tickers))
+        if report.results:
+            st.download_button(
+                label="Download All Statements (zip)",
+                data=bind_profiler(partial(export_zip, {f'{ticker}_{STATEMENT_FILES[statement]}': frame
+                                                        for (ticker, statement), frame in report.results.items()},
+                                           statement_format)),
+                file_name=f'{"_".join(financial_tickers)}_statements.zip',
+                mime='application/zip',
+                on_click="ignore",
+            )
+
+    for financial_ticker in financial_tickers if report is not None else []:
+        if len(financial_tickers) > 1:
+            st.header(financial_ticker)
+
+        # Balance Sheet
+        balance_sheet = report.results.get((financial_ticker, 'balance_sheet'))
+        if balance_sheet is not None:
+            st.subheader("Balance Sheet")
+            st.dataframe(balance_sheet)
+            st.download_button(
+                label=f"Download Balance Sheet {statement_format}",
+                data=bind_profiler(partial(export_frame, balance_sheet, statement_format)),
+                file_name=f'{financial_ticker}_balance_sheet.{extension}',
+                mime=mime,
+                key=f'{financial_ticker}_balance_sheet',
+                on_click="ignore",
+            )
+        else:
+            st.error("Balance sheet not available.")
+        
+        # Income Statement
+        income_statement = report.results.get((financial_ticker, 'financials'))
+        if income_statement is not None:
+            st.subheader("Income Statement")
+            st.dataframe(income_statement)
+            st.download_button(
+                label=f"Download Income Statement {statement_format}",
+                data=bind_profiler(partial(export_frame, income_statement, statement_format)),
+                file_name=f'{financial_ticker}_income_statement.{extension}',
+                mime=mime,
+                key=f'{financial_ticker}_income_statement',
+                on_click="ignore",
+            )
+        else:
+            st.error("Income statement not available.")
 
 # Third tab: Stock Valuation using Benjamin Graham Valuation Equation
 with tab3:
@@ -77,13 +208,13 @@ with tab3:
     discount_rate = st.number_input("Enter discount rate (as a percentage)", 0.0, 100.0, 10.0)
 
     # Benjamin Graham Valuation Equation Calculation
-    graham_stock_price = (earnings_per_share * (8.5 + 2 * growth_rate_eps)) * 4.4 / discount_rate
+    graham_price = graham_stock_price(earnings_per_share, growth_rate_eps, discount_rate)
 
     # Display the result in a larger font with light blue background, rounded edges
     st.write(f"""
         <div style='text-align: center; background-color: #d9edf7; padding: 15px; 
                     border-radius: 10px; font-size: 24px; color: #31708f;'>
-            Estimated stock price using Benjamin Graham Valuation: <strong>${graham_stock_price:.2f}</strong>
+            Estimated stock price using Benjamin Graham Valuation: <strong>${graham_price:.2f}</strong>
         </div>
     """, unsafe_allow_html=True)
 
@@ -100,3 +231,44 @@ with tab3:
     - **g** = Growth Rate of EPS
     - **r** = Discount Rate
     """)
+
+    # Batch valuation of a whole universe from the local fundamentals store
+    st.header("Screen a Universe")
+    universe_input = st.text_area("Enter tickers separated by commas or new lines", "AAPL, MSFT, KO, JNJ, XOM")
+    universe = list(dict.fromkeys(t.strip().upper() for t in universe_input.replace('\n', ',').split(',') if t.strip()))
+    valuation_model = st.selectbox("Valuation model", list(VALUATION_MODELS))
+    growth_cap = st.number_input("Cap EPS growth rate at (as a percentage)", 0.0, 100.0, 25.0)
+    dividend_growth = st.number_input("Dividend growth rate for Gordon Growth (as a percentage)", 0.0, 100.0, 3.0)
+    # Off by default: a floor drops tickers the model cannot value as well as those below it
+    filter_margin = st.checkbox("Only show tickers above a minimum margin of safety")
+    min_margin = st.slider("Minimum margin of safety (%)", -100, 100, 0, disabled=not filter_margin)
+
+    if tab3.open:
+        store = fundamentals_store()
+        stale = store.stale(universe)
+        if stale:
+            st.info(f"{len(stale)} of {len(universe)} ticker(s) have no recent fundamentals.")
+        if st.button("Refresh Fundamentals", disabled=not stale):
+            with st.spinner(f"Fetching fundamentals for {len(stale)} ticker(s)..."):
+                try:
+                    show_fetch_errors(store.refresh(stale))
+                except ValueError as error:
+                    st.error(str(error))
+
+        ranking = rank_universe(store.get(universe), valuation_model,
+                                min_margin=min_margin if filter_margin else None, discount_rate=discount_rate,
+                                growth_cap=growth_cap, dividend_growth=dividend_growth)
+        st.dataframe(ranking.drop(columns='Refreshed'), column_config={
+            'Margin of Safety': st.column_config.NumberColumn(format="%.1f%%"),
+            'Intrinsic Value': st.column_config.NumberColumn(format="$%.2f"),
+        })
+        st.download_button(
+            label="Download Ranking CSV",
+            data=bind_profiler(partial(export_frame, ranking, 'CSV')),
+            file_name=f'{valuation_model.lower().replace(" ", "_")}_ranking.csv',
+            mime='text/csv',
+            on_click="ignore",
+        )
+
+# Profiling panel, drawn last so it covers the whole rerun
+profiler_panel(profiler)
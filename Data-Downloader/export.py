@@ -0,0 +1,87 @@
+import io
+import zipfile
+
+from common.instrumentation import timed
+
+
+# File extension and MIME type of every export format
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Arrow IPC': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+# Rows converted and written at a time
+CHUNK_ROWS = 50_000
+
+
+# Function to write a DataFrame to a binary file object in row chunks
+def write_frame(df, file, fmt='CSV', chunk_rows=CHUNK_ROWS, compression='zstd'):
+    """
+    Write df (index included) to file in the given EXPORT_FORMATS format, chunk_rows at a time.
+
+    CSV output is identical to df.to_csv(). Parquet and Arrow IPC files are compressed with
+    `compression`; column labels that are not strings, such as a (Price, Ticker) MultiIndex or
+    statement dates, are stored as strings and restored by pandas on read.
+    """
+    chunks = (df.iloc[i:i + chunk_rows] for i in range(0, max(len(df), 1), chunk_rows))
+    if fmt == 'CSV':
+        text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(text, header=i == 0)
+        text.flush()
+        text.detach()
+        return
+
+    import pyarrow as pa
+
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"fmt must be one of {list(EXPORT_FORMATS)}")
+    writer = schema = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=True)
+            if writer is None:
+                schema = table.schema
+                # The first chunk fixes the schema; later chunks are cast to it
+                if fmt == 'Parquet':
+                    import pyarrow.parquet as pq
+                    writer = pq.ParquetWriter(file, schema, compression=compression)
+                else:
+                    writer = pa.ipc.new_file(file, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+            elif table.schema != schema:
+                table = table.cast(schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Function to build a download file for one DataFrame
+@timed('Export')
+def export_frame(df, fmt='CSV', **kwargs):
+    """Return a file object, positioned at the start, holding df in the given format."""
+    buffer = io.BytesIO()
+    write_frame(df, buffer, fmt, **kwargs)
+    buffer.seek(0)
+    return buffer
+
+
+# Function to bundle several DataFrames into one zip file
+@timed('Export')
+def export_zip(frames, fmt='CSV', **kwargs):
+    """
+    Return a zip file object with one file per {name: DataFrame} entry of frames.
+
+    Every file is streamed straight into its zip entry. CSV entries are deflated; Parquet
+    and Arrow IPC entries are already compressed and are stored as written.
+    """
+    extension = EXPORT_FORMATS[fmt][0]
+    method = zipfile.ZIP_DEFLATED if fmt == 'CSV' else zipfile.ZIP_STORED
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=method) as bundle:
+        for name, df in frames.items():
+            with bundle.open(f"{name}.{extension}", 'w', force_zip64=True) as file:
+                write_frame(df, file, fmt, **kwargs)
+    buffer.seek(0)
+    return buffer
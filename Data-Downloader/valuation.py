@@ -0,0 +1,85 @@
+import numpy as np
+
+from common.instrumentation import timed
+
+
+# -------------------------------
+# Valuation Models
+# -------------------------------
+# Every model takes a DataFrame of FundamentalsStore fields and returns the intrinsic value
+# per share of every row as an array; rows the model cannot value are NaN.
+
+def graham_stock_price(eps, growth_rate, discount_rate=10.0):
+    """
+    Benjamin Graham valuation: P = E * (8.5 + 2g) * 4.4 / r.
+
+    Parameters:
+    - eps: Earnings per share (scalar or array)
+    - growth_rate: Estimated EPS growth rate, as a percentage
+    - discount_rate: Discount rate, as a percentage
+    """
+    return np.asarray(eps, dtype=np.float64) * (8.5 + 2 * np.asarray(growth_rate, dtype=np.float64)) * 4.4 / discount_rate
+
+
+def graham_formula(fundamentals, discount_rate=10.0, growth_cap=25.0):
+    # Yahoo's growth figure is a single year's; cap it so one outlier year does not dominate
+    growth = np.clip(fundamentals['Growth Rate'].to_numpy(dtype=np.float64), 0.0, growth_cap)
+    return graham_stock_price(fundamentals['EPS'].to_numpy(dtype=np.float64), growth, discount_rate)
+
+
+def graham_number(fundamentals):
+    # sqrt(22.5 * EPS * Book Value); undefined for losses or negative book value
+    product = 22.5 * fundamentals['EPS'].to_numpy(dtype=np.float64) * fundamentals['Book Value'].to_numpy(dtype=np.float64)
+    return np.sqrt(np.where(product > 0, product, np.nan))
+
+
+def gordon_growth(fundamentals, discount_rate=10.0, dividend_growth=3.0):
+    # Dividend * (1 + g) / (r - g); undefined when growth reaches the discount rate
+    dividend = fundamentals['Dividend'].to_numpy(dtype=np.float64)
+    spread = discount_rate - dividend_growth
+    if spread <= 0:
+        return np.full(len(dividend), np.nan)
+    return np.where(dividend > 0, dividend * (1 + dividend_growth / 100) / (spread / 100), np.nan)
+
+
+# Model name -> (function, names of its keyword parameters)
+VALUATION_MODELS = {
+    'Graham Formula': (graham_formula, ('discount_rate', 'growth_cap')),
+    'Graham Number': (graham_number, ()),
+    'Gordon Growth': (gordon_growth, ('discount_rate', 'dividend_growth')),
+}
+
+
+# -------------------------------
+# Ranking
+# -------------------------------
+def margin_of_safety(value, price):
+    """(value - price) / value, as a percentage; NaN where the value is not positive."""
+    value = np.asarray(value, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(value > 0, (value - np.asarray(price, dtype=np.float64)) / value * 100, np.nan)
+
+
+@timed('Rank Universe')
+def rank_universe(fundamentals, model='Graham Formula', min_margin=None, **params):
+    """
+    Value every ticker of fundamentals with one of VALUATION_MODELS and rank by margin of safety.
+
+    Parameters:
+    - fundamentals: DataFrame indexed by Ticker, as returned by FundamentalsStore.get()
+    - model: Name of a VALUATION_MODELS entry
+    - min_margin: Drop tickers whose margin of safety (percent) is below this, if given
+    - params: Keyword parameters of the model; unknown names are ignored
+
+    Returns the fundamentals with 'Intrinsic Value' and 'Margin of Safety' columns, best first.
+    Tickers the model cannot value are kept at the bottom unless min_margin filters them out.
+    """
+    function, accepted = VALUATION_MODELS[model]
+    value = function(fundamentals, **{name: v for name, v in params.items() if name in accepted})
+    ranking = fundamentals.assign(**{
+        'Intrinsic Value': value,
+        'Margin of Safety': margin_of_safety(value, fundamentals['Price'].to_numpy(dtype=np.float64)),
+    })
+    if min_margin is not None:
+        ranking = ranking[ranking['Margin of Safety'] >= min_margin]
+    return ranking.sort_values('Margin of Safety', ascending=False, kind='stable', na_position='last')
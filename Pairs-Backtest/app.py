@@ -1,9 +1,26 @@
 import streamlit as st
-import yfinance as yf
 import datetime as dt
+import sys
+from pathlib import Path
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+# Shared modules live at the repository root
+ROOT = str(Path(__file__).resolve().parents[1])
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from common.charts import decimate_frame, figure_png, line_chart_png
+from common.fetch import NoDataError, fetch_many
+from common.instrumentation import count, profiler_panel, start_profiling, timed
+from common.price_store import PriceStore
+from engine import backtest_pair, calculate_max_drawdown
+from metrics import performance_metrics
+from portfolio import backtest_portfolio, portfolio_summary
+from screener import price_matrix, screen_pairs
+from streaming import StreamingPairsEngine
+from sweep import parameter_grid, run_sweep, sweep_heatmap, sweep_range
+from walk_forward import walk_forward
 
 
 st.set_page_config(
@@ -13,22 +30,107 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-# Function to calculate maximum drawdown
-def calculate_max_drawdown(pnl_series):
-    """Calculate the maximum drawdown from a PnL series."""
-    # Calculate the running maximum of the PnL series
-    running_max = pnl_series.cummax()
-    
-    # Calculate the drawdown, which is the gap between running max and current PnL
-    drawdown = running_max - pnl_series
-    
-    # Find the maximum drawdown
-    max_drawdown = drawdown.max()
-    
-    return max_drawdown
+# Timing spans of this rerun, when profiling is turned on in the sidebar
+profiler = start_profiling()
+
+# Price store shared by every session and app on this machine
+@st.cache_resource
+def price_store():
+    return PriceStore()
+
+# Function to download the daily bars of a ticker through the price store
+def download(ticker, years):
+    return price_store().get(str(ticker), dt.date.today() - dt.timedelta(days=365 * int(years)), dt.date.today())
+
+# Function to download the adjusted closes of a ticker, raising NoDataError if there are none
+def fetch_close(ticker, years, dropna=False):
+    close = download(ticker, years)['Adj Close']
+    if dropna:
+        close = close.dropna()
+    if close.empty:
+        raise NoDataError("No price data found")
+    return close
+
+# Benchmark closes, memoized across reruns and sessions; a failed fetch raises, so it is not memoized
+@st.cache_data(ttl=3600)
+def benchmark_close(ticker, years):
+    count('Benchmark Cache Misses')
+    report = fetch_many([ticker], lambda key: fetch_close(key, years))
+    if not report.ok:
+        raise NoDataError(report.errors[ticker])
+    return report.results[ticker]
+
+# Function to download the close prices of both tickers
+@timed('Load Prices')
+def load_prices(Ticker1, Ticker2, years):
+    """
+    Return the T1 and T2 adjusted close Series, or None if either ticker has no data.
+
+    Network errors are retried; if a ticker still fails, the error is shown on the page.
+    """
+    report = fetch_many([Ticker1, Ticker2], lambda key: fetch_close(key, years))
+    if not report.ok:
+        for ticker, message in report.errors.items():
+            if message != "No price data found":
+                st.error(f"Could not download {ticker}: {message}")
+        return None
+    return report.results[Ticker1], report.results[Ticker2]
+
+# Function to download the close prices of a whole universe concurrently
+@timed('Load Prices')
+def load_universe(tickers, years):
+    """Return the aligned (dates x tickers) close matrix and the fetch report."""
+    report = fetch_many(tickers, lambda ticker: fetch_close(ticker, years, dropna=True))
+    return price_matrix(report.results), report
+
+# Function to send a screened pair to the backtest
+def backtest_screened_pair(Ticker1, Ticker2):
+    st.session_state['mode'] = "Backtest"
+    st.session_state['Ticker1'] = Ticker1
+    st.session_state['Ticker2'] = Ticker2
+
+# Function to send every screened pair to the portfolio backtest
+def backtest_screened_portfolio(results):
+    st.session_state['mode'] = "Portfolio"
+    st.session_state['portfolio_pairs'] = "\n".join(f"{a}/{b}" for a, b in zip(results['Ticker1'], results['Ticker2']))
+
+# Function to parse "T1/T2" pairs, one per line or comma separated
+def parse_pairs(text):
+    pairs = [item.strip().upper().split("/") for item in text.replace(",", "\n").splitlines() if item.strip()]
+    return [(p[0].strip(), p[1].strip()) for p in pairs if len(p) == 2 and p[0].strip() and p[1].strip()]
+
+# Function to run the streaming engine, resuming from the last run of the same pair and parameters
+@timed('Streaming Backtest')
+def stream_pair(t1_close, t2_close, key, *parameters, window=60):
+    """
+    Replay only the bars after the cached run's last date, or the whole history on a cold start.
+
+    A resumed run keeps the start date of the run it extends, so the loaded history sliding
+    forward by a day appends one bar rather than replaying everything. The cached run is
+    only reused if its last bar is still loaded with the same closes, so re-adjusted
+    history starts cold.
+    """
+    cached = st.session_state.get('stream')
+    resume = cached is not None and cached['key'] == key and cached['last_date'] in t1_close.index
+    if resume:
+        last = cached['df'].iloc[-1]
+        resume = (cached['df'].index[0] <= t1_close.index[0] and last['T1 Close'] == t1_close[cached['last_date']]
+                  and last['T2 Close'] == t2_close.get(cached['last_date']))
+    if resume:
+        new_bars = t1_close.index > cached['last_date']
+        if not new_bars.any():
+            return cached['df']
+        engine = StreamingPairsEngine.from_snapshot(cached['state'])
+        df = pd.concat([cached['df'], engine.replay(t1_close[new_bars], t2_close)])
+    else:
+        engine = StreamingPairsEngine(*parameters, window=window)
+        df = engine.replay(t1_close, t2_close)
+    st.session_state['stream'] = {'key': key, 'last_date': df.index[-1], 'state': engine.snapshot(), 'df': df}
+    return df
 
 # Function to calculate pairs trading strategy
-def Pairs(Ticker1, Ticker2, years, UB_entry, LB_entry, UB_exit, LB_exit, Amount_Per_Pair=10000, Transaction_Cost=0):
+def Pairs(Ticker1, Ticker2, years, UB_entry, LB_entry, UB_exit, LB_exit, Amount_Per_Pair=10000, Transaction_Cost=0,
+          Z_Window=None):
 
     # Validating Parameters
     Ticker1 = str(Ticker1)
@@ -40,117 +142,23 @@ def Pairs(Ticker1, Ticker2, years, UB_entry, LB_entry, UB_exit, LB_exit, Amount_
     Amount_Per_Pair = float(Amount_Per_Pair)
 
     # Downloading Data
-    Ticker1Data = yf.download(Ticker1, dt.date.today() - dt.timedelta(days=365 * int(years)), dt.date.today())
-    Ticker2Data = yf.download(Ticker2, dt.date.today() - dt.timedelta(days=365 * int(years)), dt.date.today())
+    prices = load_prices(Ticker1, Ticker2, years)
 
     # Ticker validation
-    if Ticker1Data.empty or Ticker2Data.empty:
+    if prices is None:
         return None
     
-    # Setting up DataFrame
-    df = pd.DataFrame(columns=['T1 Close', 'T2 Close', 'Price Ratio', 'Z-Score', 'Signal', 'T1 Trade', 'T2 Trade', 
-                               'T1 Position', 'T2 Position', 'Transaction Cost', 'T1 Trading Cash', 
-                               'T2 Trading Cash', 'Total Trading Cash', 'T1 M2M', 'T2 M2M', 'Total M2M', 'Pnl'])
-
-    # Cleaning up stock Data & placing it into df
-    df['T1 Close'] = Ticker1Data['Adj Close']
-    df['T2 Close'] = Ticker2Data['Adj Close']
-    
-    # Calculating Price Ratio
-    df['Price Ratio'] = df['T1 Close'] / df['T2 Close']
-
-    # Calculating mean and standard deviation for the entire dataset
-    mean_ratio = df['Price Ratio'].mean()
-    std_ratio = df['Price Ratio'].std()
-
-    # Calculating Z-Score based on the entire dataset
-    df['Z-Score'] = (df['Price Ratio'] - mean_ratio) / std_ratio
-
-    # Calculating Signal based on Z-Score
-    def Calculate_Signal(row):
-        if row['Z-Score'] >= UB_entry:
-            row['Signal'] = 'Short Pair'
-        elif row['Z-Score'] <= -LB_entry:
-            row['Signal'] = 'Long Pair'
-        else:
-            row['Signal'] = 'Flat Pair'
-        return row
-    
-    df = df.apply(Calculate_Signal, axis=1)
-
-    # Populating row 0 of Positions & Trade
-    if df['Signal'].iloc[0] == 'Short Pair':
-        df.loc[df.index[0], 'T1 Position'] = -round((Amount_Per_Pair/2)/df.loc[df.index[0], 'T1 Close'])
-        df.loc[df.index[0], 'T2 Position'] = round((Amount_Per_Pair/2)/df.loc[df.index[0], 'T2 Close'])
-    elif df['Signal'].iloc[0] == 'Long Pair':
-        df.loc[df.index[0], 'T1 Position'] = round((Amount_Per_Pair/2)/df.loc[df.index[0], 'T1 Close'])
-        df.loc[df.index[0], 'T2 Position'] = -round((Amount_Per_Pair/2)/df.loc[df.index[0], 'T2 Close'])
-    else:
-        df.loc[df.index[0], 'T1 Position'] = 0
-        df.loc[df.index[0], 'T2 Position'] = 0
-    
-    df.loc[df.index[0], 'T1 Trade'] = df.loc[df.index[0], 'T1 Position']
-    df.loc[df.index[0], 'T2 Trade'] = df.loc[df.index[0], 'T2 Position']
-
-    # Populating the rest of rows for T1 Position
-    for i in range(1, len(df)):
-        if df['T1 Position'].iloc[i-1] != 0:
-            if df['Signal'].iloc[i] == 'Short Pair':
-                df.loc[df.index[i], 'T1 Position'] = df['T1 Position'].iloc[i-1] if df['T1 Position'].iloc[i-1] < 0 else -round((Amount_Per_Pair/2)/df['T1 Close'].iloc[i])
-            elif df['Signal'].iloc[i] == 'Long Pair':
-                df.loc[df.index[i], 'T1 Position'] = df['T1 Position'].iloc[i-1] if df['T1 Position'].iloc[i-1] > 0 else round((Amount_Per_Pair/2)/df['T1 Close'].iloc[i])
-            elif df['Signal'].iloc[i] == 'Flat Pair' and (df['Z-Score'].iloc[i-1]<-LB_exit and df['Z-Score'].iloc[i]>-LB_exit or df['Z-Score'].iloc[i-1]>UB_exit and df['Z-Score'].iloc[i]<UB_exit):
-                df.loc[df.index[i], 'T1 Position'] = 0
-            else:
-                df.loc[df.index[i], 'T1 Position'] = df['T1 Position'].iloc[i-1]
-        else:
-            df.loc[df.index[i], 'T1 Position'] = 0 if df['Signal'].iloc[i] == 'Flat Pair' else (-round((Amount_Per_Pair/2)/df['T1 Close'].iloc[i]) if df['Signal'].iloc[i] == 'Short Pair' else round((Amount_Per_Pair/2)/df['T1 Close'].iloc[i]))
-        
-        df.loc[df.index[i], 'T1 Trade'] = df['T1 Position'].iloc[i] - df['T1 Position'].iloc[i-1]
-
-    # Populating the rest of rows for T2 Position
-    for i in range(1, len(df)):
-        if df['T2 Position'].iloc[i-1] != 0:
-            if df['Signal'].iloc[i] == 'Short Pair':
-                df.loc[df.index[i], 'T2 Position'] = df['T2 Position'].iloc[i-1] if df['T2 Position'].iloc[i-1] > 0 else round((Amount_Per_Pair/2)/df['T2 Close'].iloc[i])
-            elif df['Signal'].iloc[i] == 'Long Pair':
-                df.loc[df.index[i], 'T2 Position'] = df['T2 Position'].iloc[i-1] if df['T2 Position'].iloc[i-1] < 0 else -round((Amount_Per_Pair/2)/df['T2 Close'].iloc[i])
-            elif df['Signal'].iloc[i] == 'Flat Pair' and (df['Z-Score'].iloc[i-1]<-LB_exit and df['Z-Score'].iloc[i]>-LB_exit or df['Z-Score'].iloc[i-1]>UB_exit and df['Z-Score'].iloc[i]<UB_exit):
-                df.loc[df.index[i], 'T2 Position'] = 0
-            else:
-                df.loc[df.index[i], 'T2 Position'] = df['T2 Position'].iloc[i-1]
-        else:
-            df.loc[df.index[i], 'T2 Position'] = 0 if df['Signal'].iloc[i] == 'Flat Pair' else (round((Amount_Per_Pair/2)/df['T2 Close'].iloc[i]) if df['Signal'].iloc[i] == 'Short Pair' else -round((Amount_Per_Pair/2)/df['T2 Close'].iloc[i]))
-        
-        df.loc[df.index[i], 'T2 Trade'] = df['T2 Position'].iloc[i] - df['T2 Position'].iloc[i-1]
-    
-    # Calculating Transaction Cost
-    def Calculate_Transaction_Cost(row):
-        multiplier = 1 if row['T1 Trade'] != 0 else 0
-        multiplier += 1 if row['T2 Trade'] != 0 else 0
-        row['Transaction Cost'] = multiplier * Transaction_Cost
-        return row
-    
-    df = df.apply(Calculate_Transaction_Cost, axis=1)
-
-    # Calculating row 0 T1 Trading Cash, T2 Trading Cash, Total Trading Cash, T1 M2M, T2 M2M, Total M2M, and Pnl
-    df.loc[df.index[0], 'T1 Trading Cash'] = -df['T1 Trade'].iloc[0] * df['T1 Close'].iloc[0] 
-    df.loc[df.index[0], 'T2 Trading Cash'] = -df['T2 Trade'].iloc[0] * df['T2 Close'].iloc[0] 
-    df.loc[df.index[0], 'Total Trading Cash'] = df['T1 Trading Cash'].iloc[0] + df['T2 Trading Cash'].iloc[0] - df['Transaction Cost'].iloc[0]
-    df.loc[df.index[0], 'T1 M2M'] = df['T1 Close'].iloc[0] * df['T1 Position'].iloc[0]
-    df.loc[df.index[0], 'T2 M2M'] = df['T2 Close'].iloc[0] * df['T2 Position'].iloc[0]
-    df.loc[df.index[0], 'Total M2M'] = df['T1 M2M'].iloc[0] + df['T2 M2M'].iloc[0]
-    df.loc[df.index[0], 'Pnl'] = df['Total Trading Cash'].iloc[0] + df['Total M2M'].iloc[0]
-    
-    # Populating the rest of rows for T1 Trading Cash, T2 Trading Cash, Total Trading Cash, T1 M2M, T2 M2M, Total M2M, and Pnl
-    for i in range(1, len(df)):
-        df.loc[df.index[i], 'T1 Trading Cash'] = df['T1 Trading Cash'].iloc[i-1] - df['T1 Trade'].iloc[i] * df['T1 Close'].iloc[i] 
-        df.loc[df.index[i], 'T2 Trading Cash'] = df['T2 Trading Cash'].iloc[i-1] - df['T2 Trade'].iloc[i] * df['T2 Close'].iloc[i] 
-        df.loc[df.index[i], 'Total Trading Cash'] = df['T1 Trading Cash'].iloc[i] + df['T2 Trading Cash'].iloc[i] - df['Transaction Cost'].iloc[i]
-        df.loc[df.index[i], 'T1 M2M'] = df['T1 Close'].iloc[i] * df['T1 Position'].iloc[i]
-        df.loc[df.index[i], 'T2 M2M'] = df['T2 Close'].iloc[i] * df['T2 Position'].iloc[i]
-        df.loc[df.index[i], 'Total M2M'] = df['T1 M2M'].iloc[i] + df['T2 M2M'].iloc[i]
-        df.loc[df.index[i], 'Pnl'] = df['Total Trading Cash'].iloc[i] + df['Total M2M'].iloc[i]
+    # A rolling Z-Score window uses the bar-by-bar engine, so no future data enters the signal
+    if Z_Window:
+        # A run over a different number of years of data is a different history, so it never resumes
+        key = (Ticker1, Ticker2, years, UB_entry, LB_entry, UB_exit, LB_exit, Amount_Per_Pair, Transaction_Cost,
+               Z_Window)
+        return stream_pair(prices[0], prices[1], key, UB_entry, LB_entry, UB_exit, LB_exit,
+                           Amount_Per_Pair, Transaction_Cost, window=Z_Window)
+
+    # Running the array-backed backtest engine on the aligned close prices
+    df = backtest_pair(prices[0], prices[1], UB_entry, LB_entry,
+                       UB_exit, LB_exit, Amount_Per_Pair, Transaction_Cost)
 
     return df
 
@@ -159,69 +167,245 @@ st.title("Pairs Trading Strategy Backtest")
 
 # Sidebar inputs
 st.sidebar.header("Input Parameters")
-Ticker1 = st.sidebar.text_input("Ticker 1", "BRX")
-Ticker2 = st.sidebar.text_input("Ticker 2", "KIM")
+st.session_state.setdefault('Ticker1', "BRX")
+st.session_state.setdefault('Ticker2', "KIM")
+mode = st.sidebar.radio("Mode", ["Backtest", "Parameter Sweep", "Walk-Forward", "Pairs Screener", "Portfolio"], key='mode')
+Ticker1 = st.sidebar.text_input("Ticker 1", key='Ticker1')
+Ticker2 = st.sidebar.text_input("Ticker 2", key='Ticker2')
 years = st.sidebar.number_input("Years of Data", min_value=1, max_value=50, value=5)
-UB_entry = st.sidebar.number_input("Upper Bound Entry Z-Score", value=1)
-LB_entry = st.sidebar.number_input("Lower Bound Entry Z-Score", value=1)
-UB_exit = st.sidebar.number_input("Upper Bound Exit Z-Score", value=0.5)
-LB_exit = st.sidebar.number_input("Lower Bound Exit Z-Score", value=0.5)
-Amount_Per_Pair = st.sidebar.number_input("Amount Per Pair", value=10000)
-Transaction_Cost = st.sidebar.number_input("Transaction Cost Per Trade", value=0)
-
-# Run the backtest
-df = Pairs(Ticker1, Ticker2, years, UB_entry, LB_entry, UB_exit, LB_exit, Amount_Per_Pair, Transaction_Cost)
-
-if df is not None:
-    # Show the results table
-    st.header("Backtest Results")
-    st.write(df)
-
-    # Plot Z-Score over time with entry and exit lines
-    st.header("Z-Score and Signal Levels")
-    plt.figure(figsize=(10, 6))
-    plt.plot(df.index, df['Z-Score'], label='Z-Score')
-    plt.axhline(UB_entry, color='red', linestyle='--', label='Upper Bound Entry')
-    plt.axhline(-LB_entry, color='green', linestyle='--', label='Lower Bound Entry')
-    plt.axhline(UB_exit, color='red', linestyle=':', label='Upper Bound Exit')
-    plt.axhline(-LB_exit, color='green', linestyle=':', label='Lower Bound Exit')
-    plt.legend()
-    st.pyplot(plt)
-
-    # Plot PnL over time
-    st.header("PnL Over Time")
-    plt.figure(figsize=(10, 6))
-    plt.plot(df.index, df['Pnl'], label='PnL', color='blue')
-    plt.legend()
-    st.pyplot(plt)
-    
-     # Benchmark comparison
-    st.header('Benchmark Comparison')
-    benchmark_ticker = 'SPY'  # Using SPY (S&P 500 ETF) as a benchmark
-    benchmark_data = yf.download(benchmark_ticker, dt.date.today() - dt.timedelta(days=365 * int(years)), dt.date.today())
-    if not benchmark_data.empty:
-        benchmark_data['Returns'] = benchmark_data['Adj Close'].pct_change().cumsum()
-        fig_benchmark, ax_benchmark = plt.subplots(figsize=(10, 5))
-        ax_benchmark.plot(df.index, df['Pnl'], label='Pairs Trading PnL')
-        ax_benchmark.plot(benchmark_data.index, benchmark_data['Returns'] * Amount_Per_Pair, label='S&P 500 Returns')
-        ax_benchmark.set_xlabel('Date')
-        ax_benchmark.set_ylabel('PnL ($)')
-        ax_benchmark.set_title('PnL vs S&P 500 Benchmark')
-        ax_benchmark.legend()
-        st.pyplot(fig_benchmark)
+chart_backend = st.sidebar.radio("Charts", ["Static", "Interactive"], horizontal=True)
+
+if mode == "Backtest":
+    UB_entry = st.sidebar.number_input("Upper Bound Entry Z-Score", value=1)
+    LB_entry = st.sidebar.number_input("Lower Bound Entry Z-Score", value=1)
+    UB_exit = st.sidebar.number_input("Upper Bound Exit Z-Score", value=0.5)
+    LB_exit = st.sidebar.number_input("Lower Bound Exit Z-Score", value=0.5)
+    Amount_Per_Pair = st.sidebar.number_input("Amount Per Pair", value=10000)
+    Transaction_Cost = st.sidebar.number_input("Transaction Cost Per Trade", value=0)
+    rolling = st.sidebar.checkbox("Rolling Z-Score (no look-ahead)")
+    Z_Window = st.sidebar.number_input("Z-Score Window", min_value=2, value=60) if rolling else None
+
+    # Run the backtest
+    df = Pairs(Ticker1, Ticker2, years, UB_entry, LB_entry, UB_exit, LB_exit, Amount_Per_Pair, Transaction_Cost,
+               Z_Window)
+
+    if df is not None:
+        # Show the results table
+        st.header("Backtest Results")
+        st.write(df)
+
+        # Plot Z-Score over time with entry and exit lines
+        st.header("Z-Score and Signal Levels")
+        levels = [(UB_entry, 'Upper Bound Entry', 'red', '--'), (-LB_entry, 'Lower Bound Entry', 'green', '--'),
+                  (UB_exit, 'Upper Bound Exit', 'red', ':'), (-LB_exit, 'Lower Bound Exit', 'green', ':')]
+        if chart_backend == "Interactive":
+            zscore_chart = df[['Z-Score']].assign(**{label: level for level, label, _, _ in levels})
+            st.line_chart(decimate_frame(zscore_chart))
+        else:
+            st.image(line_chart_png({'Z-Score': df['Z-Score']},
+                                    hlines=[(level, dict(color=color, linestyle=style, label=label))
+                                            for level, label, color, style in levels]))
+
+        # Plot PnL over time
+        st.header("PnL Over Time")
+        if chart_backend == "Interactive":
+            st.line_chart(decimate_frame(df[['Pnl']]))
+        else:
+            st.image(line_chart_png({'PnL': df['Pnl']}, styles={'PnL': dict(color='blue')}))
+
+         # Benchmark comparison
+        st.header('Benchmark Comparison')
+        benchmark_ticker = 'SPY'  # Using SPY (S&P 500 ETF) as a benchmark
+        try:
+            benchmark_data = benchmark_close(benchmark_ticker, years).to_frame()
+        except NoDataError:
+            benchmark_data = pd.DataFrame(columns=['Adj Close'])
+        if not benchmark_data.empty:
+            benchmark_data['Returns'] = benchmark_data['Adj Close'].pct_change().cumsum()
+            comparison = {'Pairs Trading PnL': df['Pnl'],
+                          'S&P 500 Returns': benchmark_data['Returns'] * Amount_Per_Pair}
+            if chart_backend == "Interactive":
+                st.line_chart(decimate_frame(pd.DataFrame(comparison)))
+            else:
+                st.image(line_chart_png(comparison, title='PnL vs S&P 500 Benchmark', xlabel='Date',
+                                        ylabel='PnL ($)', figsize=(10, 5)))
+        else:
+            st.write('Benchmark data not available.')
+
+        # Additional Stats
+        st.header('Performance Metrics')
+        metrics = performance_metrics(df['Pnl'].to_numpy(), df['T1 Position'].to_numpy(),
+                                      df['T2 Position'].to_numpy(), df['T1 Close'].to_numpy(),
+                                      df['T2 Close'].to_numpy(), Amount_Per_Pair,
+                                      benchmark_data['Adj Close'].reindex(df.index).to_numpy()
+                                      if not benchmark_data.empty else None)
+
+        st.write(f"Total PnL: ${metrics['Total PnL']:,.2f}")
+        st.write(f"Number of Trades: {metrics['Number of Trades']}")
+        st.write(f"Max Drawdown: ${metrics['Max Drawdown']:,.2f} over {metrics['Max Drawdown Duration']} bars")
+        st.write(f"Sharpe Ratio: {metrics['Sharpe Ratio']:.2f} | Sortino Ratio: {metrics['Sortino Ratio']:.2f}")
+        st.write(f"Turnover: {metrics['Turnover']:.2f}x per year | Exposure: {metrics['Exposure']:.1%}")
+        st.write(f"Hit Rate: {metrics['Hit Rate']:.1%} | Average Holding Period: "
+                 f"{metrics['Average Holding Period']:.1f} bars")
+        if 'Beta' in metrics:
+            st.write(f"Alpha vs {benchmark_ticker}: {metrics['Alpha']:.2%} | Beta: {metrics['Beta']:.3f}")
+
     else:
-        st.write('Benchmark data not available.')
+        st.write("Error: Invalid ticker data. Please check the ticker symbols and try again.")
+
+elif mode in ("Parameter Sweep", "Walk-Forward"):
+    # Sweep ranges for each threshold, evaluated on every combination
+    st.header(mode)
+    UB_entry_range = st.sidebar.slider("Upper Bound Entry Z-Score range", 0.0, 4.0, (0.5, 2.0), 0.25)
+    LB_entry_range = st.sidebar.slider("Lower Bound Entry Z-Score range", 0.0, 4.0, (0.5, 2.0), 0.25)
+    UB_exit_range = st.sidebar.slider("Upper Bound Exit Z-Score range", 0.0, 2.0, (0.0, 1.0), 0.25)
+    LB_exit_range = st.sidebar.slider("Lower Bound Exit Z-Score range", 0.0, 2.0, (0.0, 1.0), 0.25)
+    Transaction_Cost_range = st.sidebar.slider("Transaction Cost Per Trade range", 0.0, 20.0, (0.0, 0.0), 1.0)
+    step = st.sidebar.number_input("Z-Score Step", min_value=0.05, value=0.25, step=0.05)
+    Amount_Per_Pair = st.sidebar.number_input("Amount Per Pair", value=10000)
 
-    # Additional Stats
-    st.header('Performance Metrics')
-    total_pnl = df['Pnl'].iloc[-1]
-    num_trades = len(df[df['T1 Trade'] != 0])
-    max_drawdown = calculate_max_drawdown(df['Pnl'])
+    grid = parameter_grid(sweep_range(UB_entry_range, step), sweep_range(LB_entry_range, step),
+                          sweep_range(UB_exit_range, step), sweep_range(LB_exit_range, step),
+                          sweep_range(Transaction_Cost_range, 1.0))
+    st.write(f"{len(grid):,} parameter combinations")
 
-    st.write(f"Total PnL: ${total_pnl:,.2f}")
-    st.write(f"Number of Trades: {num_trades}")
-    st.write(f"Max Drawdown: ${max_drawdown:,.2f}")
+    if mode == "Parameter Sweep" and st.button("Run Sweep"):
+        prices = load_prices(Ticker1, Ticker2, years)
+        if prices is not None:
+            t2_close = prices[1].reindex(prices[0].index)
+            results = run_sweep(prices[0].to_numpy(), t2_close.to_numpy(), grid, Amount_Per_Pair)
+
+            st.subheader("Ranked Results")
+            st.dataframe(results)
+
+            # Heatmap of the best PnL for each pair of entry thresholds
+            st.subheader("Total PnL Heatmap")
+            heatmap = sweep_heatmap(results, x='UB_entry', y='LB_entry')
+            import matplotlib.pyplot as plt
+            fig_heatmap, ax_heatmap = plt.subplots(figsize=(10, 6))
+            image = ax_heatmap.imshow(heatmap.to_numpy(), origin='lower', aspect='auto', cmap='RdYlGn')
+            ax_heatmap.set_xticks(range(len(heatmap.columns)), [f"{v:.2f}" for v in heatmap.columns])
+            ax_heatmap.set_yticks(range(len(heatmap.index)), [f"{v:.2f}" for v in heatmap.index])
+            ax_heatmap.set_xlabel('Upper Bound Entry Z-Score')
+            ax_heatmap.set_ylabel('Lower Bound Entry Z-Score')
+            ax_heatmap.set_title('Best Total PnL over Exit Thresholds and Costs')
+            fig_heatmap.colorbar(image, ax=ax_heatmap, label='PnL ($)')
+            st.image(figure_png(fig_heatmap))
+        else:
+            st.write("Error: Invalid ticker data. Please check the ticker symbols and try again.")
+
+    if mode == "Walk-Forward":
+        # Fit the thresholds on each in-sample window and trade them on the next one
+        in_sample = st.sidebar.number_input("In-Sample Bars", min_value=20, value=504)
+        out_of_sample = st.sidebar.number_input("Out-of-Sample Bars", min_value=5, value=126)
+        Z_Window = st.sidebar.number_input("Z-Score Window", min_value=2, value=60)
+
+        if st.button("Run Walk-Forward"):
+            prices = load_prices(Ticker1, Ticker2, years)
+            if prices is not None and len(prices[0]) > in_sample:
+                t2_close = prices[1].reindex(prices[0].index)
+                stitched, folds = walk_forward(prices[0].to_numpy(), t2_close.to_numpy(), grid, int(in_sample),
+                                               int(out_of_sample), int(Z_Window), Amount_Per_Pair)
+                dates = prices[0].index
+                for column in ['In-Sample Start', 'In-Sample End', 'Out-of-Sample Start', 'Out-of-Sample End']:
+                    folds[column] = dates[folds[column]]
+
+                st.subheader("Stitched Out-of-Sample PnL")
+                import matplotlib.pyplot as plt
+                fig_walk_forward, ax_walk_forward = plt.subplots(figsize=(10, 6))
+                ax_walk_forward.plot(dates, stitched, label='Out-of-Sample PnL', color='blue')
+                for start in folds['Out-of-Sample Start']:
+                    ax_walk_forward.axvline(start, color='grey', linestyle=':', linewidth=0.8)
+                ax_walk_forward.set_xlabel('Date')
+                ax_walk_forward.set_ylabel('PnL ($)')
+                ax_walk_forward.legend()
+                st.image(figure_png(fig_walk_forward))
+
+                st.subheader("Fold Diagnostics")
+                st.dataframe(folds)
+            else:
+                st.write("Error: Not enough price data for one in-sample window. Check the tickers and window sizes.")
+
+elif mode == "Pairs Screener":
+    # Screen a universe for the most cointegrated pairs
+    st.header("Pairs Screener")
+    universe = st.sidebar.text_area("Ticker Universe", "BRX KIM REG FRT SPG MAC KRG AKR ROIC UE SKT PECO")
+    n_candidates = st.sidebar.number_input("Candidate Pairs to Test", min_value=1, value=200)
+    top_k = st.sidebar.number_input("Pairs to Show", min_value=1, value=20)
+
+    if st.button("Run Screener"):
+        prices, report = load_universe(universe.replace(",", " ").split(), years)
+        if not report.ok:
+            st.warning(f"Skipped {len(report.errors)} ticker(s) without data.")
+            st.dataframe(report.error_frame())
+        if prices.shape[1] >= 2:
+            st.session_state['screener_results'] = screen_pairs(prices, n_candidates, top_k)
+        else:
+            st.session_state.pop('screener_results', None)
+            st.write("Error: At least two tickers with price data are needed.")
+
+    results = st.session_state.get('screener_results')
+    if results is not None:
+        st.subheader("Top Pairs")
+        st.dataframe(results)
+        choice = st.selectbox("Pair", range(len(results)),
+                              format_func=lambda k: f"{results['Ticker1'][k]} / {results['Ticker2'][k]}")
+        st.button("Backtest Selected Pair", on_click=backtest_screened_pair,
+                  args=(results['Ticker1'][choice], results['Ticker2'][choice]))
+        st.button("Backtest All as Portfolio", on_click=backtest_screened_portfolio, args=(results,))
 
 else:
-    st.write("Error: Invalid ticker data. Please check the ticker symbols and try again.")
+    # Backtest many pairs at once with a shared capital budget
+    st.header("Portfolio Backtest")
+    st.session_state.setdefault('portfolio_pairs', "BRX/KIM\nREG/FRT\nSPG/MAC")
+    pairs_text = st.sidebar.text_area("Pairs (T1/T2, one per line)", key='portfolio_pairs')
+    UB_entry = st.sidebar.number_input("Upper Bound Entry Z-Score", value=1)
+    LB_entry = st.sidebar.number_input("Lower Bound Entry Z-Score", value=1)
+    UB_exit = st.sidebar.number_input("Upper Bound Exit Z-Score", value=0.5)
+    LB_exit = st.sidebar.number_input("Lower Bound Exit Z-Score", value=0.5)
+    Amount_Per_Pair = st.sidebar.number_input("Amount Per Pair", value=10000)
+    Transaction_Cost = st.sidebar.number_input("Transaction Cost Per Trade", value=0)
+    Capital = st.sidebar.number_input("Total Capital (0 for no limit)", min_value=0, value=0)
+
+    pairs = parse_pairs(pairs_text)
+    if st.button("Run Portfolio Backtest") and pairs:
+        tickers = list(dict.fromkeys(ticker for pair in pairs for ticker in pair))
+        prices, report = load_universe(tickers, years)
+        if not report.ok:
+            st.warning(f"Skipped {len(report.errors)} ticker(s) without data.")
+            st.dataframe(report.error_frame())
+        pairs = [(a, b) for a, b in pairs if a in prices.columns and b in prices.columns]
+
+        if pairs and len(prices):
+            names = [f"{a}/{b}" for a, b in pairs]
+            results = backtest_portfolio(prices[[a for a, _ in pairs]].to_numpy(),
+                                         prices[[b for _, b in pairs]].to_numpy(),
+                                         float(UB_entry), float(LB_entry), float(UB_exit), float(LB_exit),
+                                         float(Amount_Per_Pair), Transaction_Cost, Capital or None)
+
+            st.subheader("Portfolio PnL")
+            import matplotlib.pyplot as plt
+            fig_portfolio, (ax_pnl, ax_exposure) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
+            ax_pnl.plot(prices.index, results['Total Pnl'], label='Total PnL', color='blue')
+            ax_pnl.set_ylabel('PnL ($)')
+            ax_pnl.legend()
+            ax_exposure.plot(prices.index, results['Gross Exposure'], label='Gross Exposure')
+            ax_exposure.plot(prices.index, results['Capital Usage'], label='Capital Usage')
+            ax_exposure.set_xlabel('Date')
+            ax_exposure.set_ylabel('($)')
+            ax_exposure.legend()
+            st.image(figure_png(fig_portfolio))
+
+            st.subheader("Per-Pair Results")
+            st.dataframe(portfolio_summary(results, names))
+
+            st.header('Performance Metrics')
+            st.write(f"Total PnL: ${results['Total Pnl'][-1]:,.2f}")
+            st.write(f"Number of Trades: {int(results['Number of Trades'].sum())}")
+            st.write(f"Max Drawdown: ${calculate_max_drawdown(pd.Series(results['Total Pnl'])):,.2f}")
+            st.write(f"Peak Capital Usage: ${results['Capital Usage'].max():,.2f}")
+        else:
+            st.write("Error: No pair has price data for both tickers.")
 
+# Profiling panel, drawn last so it covers the whole rerun
+profiler_panel(profiler)
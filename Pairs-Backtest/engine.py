@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+from common.instrumentation import span, timed
+
+
+# Signal codes used by the array engine (index into SIGNAL_LABELS)
+FLAT, SHORT, LONG = 0, 1, 2
+SIGNAL_LABELS = np.array(['Flat Pair', 'Short Pair', 'Long Pair'], dtype=object)
+
+# Output columns, in the same order as the original row-by-row implementation
+COLUMNS = ['T1 Close', 'T2 Close', 'Price Ratio', 'Z-Score', 'Signal', 'T1 Trade', 'T2 Trade',
+           'T1 Position', 'T2 Position', 'Transaction Cost', 'T1 Trading Cash',
+           'T2 Trading Cash', 'Total Trading Cash', 'T1 M2M', 'T2 M2M', 'Total M2M', 'Pnl']
+
+
+# Function to calculate maximum drawdown
+def calculate_max_drawdown(pnl_series):
+    """Calculate the maximum drawdown from a PnL series."""
+    # Calculate the running maximum of the PnL series
+    running_max = pnl_series.cummax()
+    
+    # Calculate the drawdown, which is the gap between running max and current PnL
+    drawdown = running_max - pnl_series
+    
+    # Find the maximum drawdown
+    max_drawdown = drawdown.max()
+    
+    return max_drawdown
+
+
+# Function to calculate the full-sample Z-Score of the price ratio
+@timed('Z-Score')
+def calculate_zscore(price_ratio):
+    """Z-Score of the price ratio using the mean and standard deviation of the entire dataset."""
+    ratio = pd.Series(price_ratio)
+    return ((ratio - ratio.mean()) / ratio.std()).to_numpy()
+
+
+# Function to calculate signal codes from the Z-Score
+@timed('Signals')
+def calculate_signals(z_score, UB_entry, LB_entry):
+    """Return an int8 array of FLAT/SHORT/LONG codes for each bar."""
+    z_score = np.asarray(z_score, dtype=np.float64)
+    signal = np.full(z_score.shape, FLAT, dtype=np.int8)
+    signal[z_score <= -LB_entry] = LONG
+    # Short is checked first in the original rules, so it wins when both bounds are hit
+    signal[z_score >= UB_entry] = SHORT
+    return signal
+
+
+# Function to flag bars where the Z-Score crosses back through an exit level
+@timed('Exits')
+def calculate_exits(z_score, UB_exit, LB_exit):
+    """Return a bool array that is True where the Z-Score crossed an exit level on that bar."""
+    z_score = np.asarray(z_score, dtype=np.float64)
+    exits = np.zeros(z_score.shape, dtype=bool)
+    prev, cur = z_score[:-1], z_score[1:]
+    exits[1:] = ((prev < -LB_exit) & (cur > -LB_exit)) | ((prev > UB_exit) & (cur < UB_exit))
+    return exits
+
+
+# Function to run the entry/exit state machine for both legs
+@timed('Positions')
+def calculate_positions(signal, exits, t1_close, t2_close, Amount_Per_Pair=10000):
+    """
+    Run the entry/exit hysteresis in one pass and return the T1 and T2 positions.
+
+    Each leg keeps its own state, exactly as the original per-leg loops did: a flat leg
+    takes the position implied by the signal, an open leg is kept while the signal agrees
+    with it, resized when the signal flips, and closed on a Flat bar that crosses an exit.
+    """
+    half = float(Amount_Per_Pair) / 2
+    t1_size = np.round(half / np.asarray(t1_close, dtype=np.float64)).tolist()
+    t2_size = np.round(half / np.asarray(t2_close, dtype=np.float64)).tolist()
+
+    n = len(signal)
+    t1_position = np.zeros(n, dtype=np.int64)
+    t2_position = np.zeros(n, dtype=np.int64)
+    p1 = p2 = 0
+    for i, (s, x) in enumerate(zip(signal.tolist(), exits.tolist())):
+        if s == SHORT:
+            p1 = p1 if p1 < 0 else -int(t1_size[i])
+            p2 = p2 if p2 > 0 else int(t2_size[i])
+        elif s == LONG:
+            p1 = p1 if p1 > 0 else int(t1_size[i])
+            p2 = p2 if p2 < 0 else -int(t2_size[i])
+        elif x:
+            p1 = p2 = 0
+        t1_position[i] = p1
+        t2_position[i] = p2
+
+    return t1_position, t2_position
+
+
+# Function to run the full backtest on NumPy arrays
+def backtest_arrays(t1_close, t2_close, UB_entry, LB_entry, UB_exit, LB_exit,
+                    Amount_Per_Pair=10000, Transaction_Cost=0, z_score=None):
+    """
+    Run the pairs strategy on aligned close-price arrays and return a dict of result arrays.
+
+    If z_score is None it is computed from the mean and standard deviation of the whole
+    price ratio, as in the original Pairs() implementation.
+    """
+    t1_close = np.asarray(t1_close, dtype=np.float64)
+    t2_close = np.asarray(t2_close, dtype=np.float64)
+    price_ratio = t1_close / t2_close
+    if z_score is None:
+        z_score = calculate_zscore(price_ratio)
+    else:
+        z_score = np.asarray(z_score, dtype=np.float64)
+
+    signal = calculate_signals(z_score, UB_entry, LB_entry)
+    exits = calculate_exits(z_score, UB_exit, LB_exit)
+    t1_position, t2_position = calculate_positions(signal, exits, t1_close, t2_close, Amount_Per_Pair)
+
+    with span('Cash and M2M'):
+        t1_trade = np.diff(t1_position, prepend=0)
+        t2_trade = np.diff(t2_position, prepend=0)
+        transaction_cost = ((t1_trade != 0).astype(np.int64) + (t2_trade != 0)) * float(Transaction_Cost)
+
+        # Cash accumulates the signed trade notional, M2M marks the open position to market
+        t1_cash = np.cumsum(-(t1_trade * t1_close))
+        t2_cash = np.cumsum(-(t2_trade * t2_close))
+        total_cash = t1_cash + t2_cash - transaction_cost
+        t1_m2m = t1_close * t1_position
+        t2_m2m = t2_close * t2_position
+        total_m2m = t1_m2m + t2_m2m
+
+    return {
+        'T1 Close': t1_close,
+        'T2 Close': t2_close,
+        'Price Ratio': price_ratio,
+        'Z-Score': z_score,
+        'Signal': signal,
+        'T1 Trade': t1_trade,
+        'T2 Trade': t2_trade,
+        'T1 Position': t1_position,
+        'T2 Position': t2_position,
+        'Transaction Cost': transaction_cost,
+        'T1 Trading Cash': t1_cash,
+        'T2 Trading Cash': t2_cash,
+        'Total Trading Cash': total_cash,
+        'T1 M2M': t1_m2m,
+        'T2 M2M': t2_m2m,
+        'Total M2M': total_m2m,
+        'Pnl': total_cash + total_m2m,
+    }
+
+
+# Function to run the backtest on two price series and return the results DataFrame
+@timed('Backtest')
+def backtest_pair(t1_close, t2_close, UB_entry, LB_entry, UB_exit, LB_exit,
+                  Amount_Per_Pair=10000, Transaction_Cost=0):
+    """Run the pairs strategy on two close-price Series, aligned on the dates of the first."""
+    t2_close = t2_close.reindex(t1_close.index)
+    results = backtest_arrays(t1_close.to_numpy(), t2_close.to_numpy(), UB_entry, LB_entry,
+                              UB_exit, LB_exit, Amount_Per_Pair, Transaction_Cost)
+    results['Signal'] = SIGNAL_LABELS[results['Signal']]
+    return pd.DataFrame(results, index=t1_close.index, columns=COLUMNS)
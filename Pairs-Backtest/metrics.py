@@ -0,0 +1,110 @@
+import numpy as np
+
+from common.instrumentation import timed
+
+
+# Trading days per year used to annualise the ratios
+PERIODS_PER_YEAR = 252
+
+METRICS = ['Total PnL', 'Number of Trades', 'Max Drawdown', 'Max Drawdown Duration', 'Sharpe Ratio',
+           'Sortino Ratio', 'Turnover', 'Hit Rate', 'Average Holding Period', 'Exposure']
+BENCHMARK_METRICS = ['Alpha', 'Beta']
+
+
+# Function to calculate the maximum drawdown and its duration on a PnL array
+def drawdown(pnl):
+    """
+    Return the maximum drawdown and the longest time, in bars, spent below a previous peak.
+
+    Missing values are skipped by the running peak, as in calculate_max_drawdown().
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    if not len(pnl):
+        return np.nan, 0
+    running_max = np.fmax.accumulate(pnl)
+    gap = running_max - pnl
+    max_drawdown = np.nanmax(gap) if not np.isnan(gap).all() else np.nan
+    bars = np.arange(len(pnl))
+    last_peak = np.maximum.accumulate(np.where(gap > 0, 0, bars))
+    return max_drawdown, int((bars - last_peak).max())
+
+
+# Function to split the position history into individual trades
+def trade_spans(t1_position, t2_position):
+    """
+    Return the (entry, exit) bar of every trade; a trade ends when the position is closed or flipped.
+
+    The exit bar is the bar on which the position changed, or the last bar for a trade still open.
+    """
+    state = np.sign(t1_position) + 3 * np.sign(t2_position)
+    change = np.flatnonzero(np.diff(state, prepend=0, append=0))
+    starts, ends = change[:-1], change[1:]
+    held = state[starts] != 0
+    return starts[held], np.minimum(ends[held], len(state) - 1)
+
+
+# Function to calculate every performance metric of a backtest at once
+@timed('Performance Metrics')
+def performance_metrics(pnl, t1_position, t2_position, t1_close, t2_close, Amount_Per_Pair=10000,
+                        benchmark_close=None, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Summarise a backtest from its PnL, position and close arrays.
+
+    Returns are the daily PnL changes on Amount_Per_Pair of capital. Turnover is the traded
+    notional per year as a multiple of that capital, the hit rate is the share of trades
+    that made money, the holding period is in bars and exposure is the share of bars with
+    an open position. When benchmark_close (aligned with pnl) is given, the annualised
+    Alpha and the Beta of the strategy returns against the benchmark returns are added.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    t1_position = np.asarray(t1_position)
+    t2_position = np.asarray(t2_position)
+    n = len(pnl)
+    capital = float(Amount_Per_Pair)
+
+    returns = np.diff(pnl, prepend=0) / capital
+    valid = returns[np.isfinite(returns)]
+    mean = valid.mean() if len(valid) else np.nan
+    std = valid.std(ddof=1) if len(valid) > 1 else np.nan
+    downside = np.sqrt(np.mean(np.minimum(valid, 0) ** 2)) if len(valid) else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = mean / std * np.sqrt(periods_per_year)
+        sortino = mean / downside * np.sqrt(periods_per_year)
+
+    t1_trade = np.diff(t1_position, prepend=0)
+    t2_trade = np.diff(t2_position, prepend=0)
+    traded = np.nansum(np.abs(t1_trade * t1_close) + np.abs(t2_trade * t2_close))
+
+    # The PnL of bar t is earned by the position held into it, so a trade earns the bars after its
+    # entry up to and including its exit, and the bar a position flips on belongs to the closing trade
+    entries, exits = trade_spans(t1_position, t2_position)
+    trade_pnl = pnl[exits] - pnl[entries] if len(entries) else np.empty(0)
+    max_drawdown, duration = drawdown(pnl)
+
+    metrics = {
+        'Total PnL': pnl[-1] if n else np.nan,
+        'Number of Trades': int(np.count_nonzero(t1_trade)),
+        'Max Drawdown': max_drawdown,
+        'Max Drawdown Duration': duration,
+        'Sharpe Ratio': sharpe,
+        'Sortino Ratio': sortino,
+        'Turnover': traded / capital * periods_per_year / n if n else np.nan,
+        'Hit Rate': np.mean(trade_pnl > 0) if len(trade_pnl) else np.nan,
+        'Average Holding Period': np.mean(exits - entries) if len(entries) else np.nan,
+        'Exposure': np.mean((t1_position != 0) | (t2_position != 0)) if n else np.nan,
+    }
+
+    if benchmark_close is not None:
+        benchmark = np.asarray(benchmark_close, dtype=np.float64)
+        benchmark_returns = np.diff(benchmark, prepend=np.nan) / np.concatenate(([np.nan], benchmark[:-1]))
+        both = np.isfinite(returns) & np.isfinite(benchmark_returns)
+        r, b = returns[both], benchmark_returns[both]
+        if len(r) > 1 and b.var() > 0:
+            beta = np.mean((r - r.mean()) * (b - b.mean())) / b.var()
+            alpha = (r.mean() - beta * b.mean()) * periods_per_year
+        else:
+            alpha = beta = np.nan
+        metrics['Alpha'] = alpha
+        metrics['Beta'] = beta
+
+    return metrics
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from common.instrumentation import timed
+from engine import LONG, SHORT, calculate_exits, calculate_signals
+
+
+# Function to compute the full-sample Z-Score of every pair's price ratio
+def calculate_zscores(price_ratio):
+    """Column-wise Z-Score of a (time x pair) ratio matrix, skipping missing values like Pairs()."""
+    ratio = pd.DataFrame(price_ratio)
+    return ((ratio - ratio.mean()) / ratio.std()).to_numpy()
+
+
+# Function to step the entry/exit state machine across all pairs at once
+def calculate_portfolio_positions(signal, exits, z_score, t1_close, t2_close, Amount_Per_Pair=10000,
+                                  Capital=None):
+    """
+    Run the Pairs() entry/exit rules bar by bar, with every pair updated together.
+
+    Without Capital each pair trades independently, exactly as in engine.calculate_positions.
+    With Capital, a flat pair may only open while the number of open pairs times its
+    Amount_Per_Pair fits in the budget; competing entries are taken in order of |Z-Score|.
+    """
+    half = np.broadcast_to(np.asarray(Amount_Per_Pair, dtype=np.float64) / 2, t1_close.shape[1:])
+    amount = 2 * half
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1_size = np.round(half / t1_close)
+        t2_size = np.round(half / t2_close)
+
+    n, m = signal.shape
+    t1_position = np.zeros((n, m))
+    t2_position = np.zeros((n, m))
+    p1 = np.zeros(m)
+    p2 = np.zeros(m)
+    for i in range(n):
+        s, x = signal[i], exits[i]
+        short, long = s == SHORT, s == LONG
+        new1 = np.where(short, np.where(p1 < 0, p1, -t1_size[i]),
+                        np.where(long, np.where(p1 > 0, p1, t1_size[i]), np.where(x, 0.0, p1)))
+        new2 = np.where(short, np.where(p2 > 0, p2, t2_size[i]),
+                        np.where(long, np.where(p2 < 0, p2, -t2_size[i]), np.where(x, 0.0, p2)))
+
+        if Capital is not None:
+            was_open = (p1 != 0) | (p2 != 0)
+            opening = ~was_open & ((new1 != 0) | (new2 != 0))
+            if opening.any():
+                staying = was_open & ((new1 != 0) | (new2 != 0))
+                budget = Capital - amount[staying].sum()
+                candidates = np.flatnonzero(opening)
+                candidates = candidates[np.argsort(-np.abs(z_score[i, candidates]), kind='stable')]
+                allowed = np.cumsum(amount[candidates]) <= budget
+                blocked = candidates[~allowed]
+                new1[blocked] = 0.0
+                new2[blocked] = 0.0
+
+        t1_position[i] = p1 = new1
+        t2_position[i] = p2 = new2
+
+    return t1_position, t2_position
+
+
+# Function to backtest many pairs at once on (time x pair) price matrices
+@timed('Portfolio Backtest')
+def backtest_portfolio(t1_close, t2_close, UB_entry, LB_entry, UB_exit, LB_exit,
+                       Amount_Per_Pair=10000, Transaction_Cost=0, Capital=None, z_score=None):
+    """
+    Run the pairs strategy on every column of two aligned (time x pair) close matrices.
+
+    Amount_Per_Pair may be a scalar shared by every pair or one value per pair. Returns a
+    dict with per-pair 'Pnl', 'T1 Position' and 'T2 Position' matrices, per-pair
+    'Number of Trades', and the portfolio 'Total Pnl', 'Gross Exposure', 'Open Pairs' and
+    'Capital Usage' series. Each pair's PnL matches backtest_arrays() on that pair alone
+    when no Capital limit is set.
+    """
+    t1_close = np.asarray(t1_close, dtype=np.float64)
+    t2_close = np.asarray(t2_close, dtype=np.float64)
+    price_ratio = t1_close / t2_close
+    if z_score is None:
+        z_score = calculate_zscores(price_ratio)
+
+    signal = calculate_signals(z_score, UB_entry, LB_entry)
+    exits = calculate_exits(z_score, UB_exit, LB_exit)
+    t1_position, t2_position = calculate_portfolio_positions(signal, exits, z_score, t1_close, t2_close,
+                                                             Amount_Per_Pair, Capital)
+
+    t1_trade = np.diff(t1_position, axis=0, prepend=0)
+    t2_trade = np.diff(t2_position, axis=0, prepend=0)
+    transaction_cost = ((t1_trade != 0).astype(np.int64) + (t2_trade != 0)) * float(Transaction_Cost)
+
+    # Same accounting as backtest_arrays(), one column per pair
+    pnl = np.cumsum(-(t1_trade * t1_close), axis=0)
+    pnl += np.cumsum(-(t2_trade * t2_close), axis=0)
+    pnl -= transaction_cost
+    m2m = t1_close * t1_position
+    m2m += t2_close * t2_position
+    pnl += m2m
+
+    open_pairs = ((t1_position != 0) | (t2_position != 0))
+    amount = np.broadcast_to(np.asarray(Amount_Per_Pair, dtype=np.float64), t1_close.shape[1:])
+    return {
+        'Pnl': pnl,
+        'T1 Position': t1_position,
+        'T2 Position': t2_position,
+        'Number of Trades': np.count_nonzero(t1_trade, axis=0),
+        'Total Pnl': np.nansum(pnl, axis=1),
+        'Gross Exposure': np.nansum(np.abs(t1_close * t1_position) + np.abs(t2_close * t2_position), axis=1),
+        'Open Pairs': open_pairs.sum(axis=1),
+        'Capital Usage': open_pairs @ amount,
+    }
+
+
+# Function to summarise a portfolio backtest per pair
+def portfolio_summary(results, pair_names):
+    """One row per pair with its Total PnL, Number of Trades and Max Drawdown."""
+    pnl = pd.DataFrame(results['Pnl'], columns=pair_names)
+    return pd.DataFrame({
+        'Total PnL': pnl.iloc[-1],
+        'Number of Trades': results['Number of Trades'],
+        'Max Drawdown': (pnl.cummax() - pnl).max(),
+    }, index=pair_names)
@@ -0,0 +1,131 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.instrumentation import timed
+from shared_arrays import attach, share
+
+
+# Engle-Granger critical values for the ADF statistic of a two-variable cointegrating residual
+EG_CRITICAL_VALUES = {0.01: -3.90, 0.05: -3.34, 0.10: -3.04}
+
+STATISTICS = ['Hedge Ratio', 'ADF Statistic', 'Cointegrated', 'Half-Life',
+              'Spread Mean', 'Spread Std', 'Spread Z-Score']
+
+
+# Function to align the adjusted closes of a universe into one price matrix
+def price_matrix(closes, max_missing=0.05):
+    """
+    Build a (dates x tickers) matrix from {ticker: close Series}.
+
+    Tickers missing more than max_missing of the dates are dropped, then dates where any
+    remaining ticker has no price are dropped.
+    """
+    prices = pd.DataFrame(closes)
+    prices = prices.loc[:, prices.isna().mean() <= max_missing]
+    return prices.dropna()
+
+
+# Function to compute the pairwise correlation of daily log returns in one pass
+def return_correlation(prices):
+    """Correlation matrix of the log returns of every column of prices."""
+    returns = np.diff(np.log(np.asarray(prices, dtype=np.float64)), axis=0)
+    returns -= returns.mean(axis=0)
+    returns /= returns.std(axis=0, ddof=1)
+    return returns.T @ returns / (len(returns) - 1)
+
+
+# Function to pick the most correlated pairs from a correlation matrix
+def top_correlated_pairs(corr, n_candidates):
+    """Return (i, j) index arrays of the n_candidates highest-correlation pairs with i < j."""
+    i, j = np.triu_indices(corr.shape[0], k=1)
+    values = corr[i, j]
+    n_candidates = min(n_candidates, values.size)
+    best = np.argpartition(-values, n_candidates - 1)[:n_candidates] if n_candidates else []
+    best = best[np.argsort(-values[best], kind='stable')]
+    return i[best], j[best]
+
+
+# Function to test one pair for cointegration
+def cointegration_stats(log_p1, log_p2):
+    """
+    Engle-Granger test and spread statistics for log_p1 against log_p2.
+
+    The hedge ratio is the OLS slope of log_p1 on log_p2; the spread is the regression
+    residual. The ADF regression uses one lagged difference, and the half-life is that of an
+    AR(1) fit of the spread's changes on its level.
+    """
+    X = np.column_stack((np.ones_like(log_p2), log_p2))
+    (intercept, hedge_ratio), *_ = np.linalg.lstsq(X, log_p1, rcond=None)
+    spread = log_p1 - intercept - hedge_ratio * log_p2
+
+    # ADF: d(spread)_t = gamma * spread_{t-1} + phi * d(spread)_{t-1} + e_t
+    change = np.diff(spread)
+    y = change[1:]
+    X = np.column_stack((spread[1:-1], change[:-1]))
+    coef, residual, *_ = np.linalg.lstsq(X, y, rcond=None)
+    sigma2 = residual[0] / (len(y) - X.shape[1]) if residual.size else np.nan
+    se = np.sqrt(sigma2 * np.linalg.inv(X.T @ X)[0, 0])
+    adf = coef[0] / se
+
+    # Half-life of mean reversion from d(spread)_t = c + lambda * spread_{t-1}
+    X = np.column_stack((np.ones(len(change)), spread[:-1]))
+    (_, decay), *_ = np.linalg.lstsq(X, change, rcond=None)
+    half_life = -np.log(2) / decay if decay < 0 else np.inf
+
+    mean, std = spread.mean(), spread.std(ddof=1)
+    return {
+        'Hedge Ratio': hedge_ratio,
+        'ADF Statistic': adf,
+        'Cointegrated': adf < EG_CRITICAL_VALUES[0.05],
+        'Half-Life': half_life,
+        'Spread Mean': mean,
+        'Spread Std': std,
+        'Spread Z-Score': (spread[-1] - mean) / std,
+    }
+
+
+# Function to test a block of candidate pairs against a (tickers x dates) log-price matrix
+def _test_pairs(log_prices, pairs):
+    return [tuple(cointegration_stats(log_prices[i], log_prices[j]).values()) for i, j in pairs]
+
+
+def _test_pairs_shared(handle, pairs):
+    return _test_pairs(attach(handle), pairs)
+
+
+# Function to screen a universe for cointegrated pairs
+@timed('Screen Pairs')
+def screen_pairs(prices, n_candidates=200, top_k=20, max_workers=None, chunk_size=32):
+    """
+    Rank the pairs of a (dates x tickers) price matrix for pairs trading.
+
+    All pairwise return correlations are computed at once; only the n_candidates most
+    correlated pairs are tested for cointegration, on a process pool sharing one copy of the
+    log prices. Returns the top_k pairs by ADF statistic (most negative first), with
+    Ticker1/Ticker2 ready to pass into Pairs().
+    """
+    tickers = list(prices.columns)
+    corr = return_correlation(prices)
+    i, j = top_correlated_pairs(corr, n_candidates)
+    pairs = list(zip(i.tolist(), j.tolist()))
+    chunks = [pairs[k:k + chunk_size] for k in range(0, len(pairs), chunk_size)]
+
+    log_prices = np.log(prices.to_numpy(dtype=np.float64).T)
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(chunks))
+    if max_workers <= 1:
+        rows = [row for chunk in chunks for row in _test_pairs(log_prices, chunk)]
+    else:
+        with share(log_prices) as handle, ProcessPoolExecutor(max_workers=max_workers) as pool:
+            blocks = pool.map(_test_pairs_shared, itertools.repeat(handle), chunks)
+            rows = [row for block in blocks for row in block]
+
+    results = pd.DataFrame(rows, columns=STATISTICS)
+    results.insert(0, 'Ticker1', [tickers[a] for a in i])
+    results.insert(1, 'Ticker2', [tickers[b] for b in j])
+    results.insert(2, 'Correlation', corr[i, j])
+    return results.sort_values('ADF Statistic', kind='stable', ignore_index=True).head(top_k)
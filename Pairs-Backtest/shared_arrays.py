@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Blocks mapped by this process, kept open for the lifetime of the worker: name -> (block, array)
+_attached = {}
+
+
+@contextmanager
+def share(array):
+    """
+    Copy array into a new shared memory block for worker processes.
+
+    Yields a small, picklable handle to pass to attach(); the block is freed on exit.
+    """
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    try:
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+        view[...] = array
+        del view
+        yield shm.name, array.shape, array.dtype.str
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def attach(handle):
+    """Map a block created by share() as a read-only array, without copying it."""
+    name, shape, dtype = handle
+    if name not in _attached:
+        shm = shared_memory.SharedMemory(name=name)
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        _attached[name] = (shm, array)
+    return _attached[name][1]
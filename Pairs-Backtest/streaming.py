@@ -0,0 +1,199 @@
+import math
+from collections import deque
+
+import pandas as pd
+
+from engine import COLUMNS, FLAT, LONG, SHORT, SIGNAL_LABELS
+
+
+# Column dtypes of replay(), matching engine.backtest_pair(); an empty replay has no rows to infer them from
+ROW_DTYPES = {**dict.fromkeys(COLUMNS, 'float64'), 'Signal': 'str',
+              **dict.fromkeys(['T1 Trade', 'T2 Trade', 'T1 Position', 'T2 Position'], 'int64')}
+
+
+# -------------------------------
+# Online rolling statistics
+# -------------------------------
+class RollingStats:
+    """
+    Mean and sample standard deviation of the last `window` values, updated in O(1).
+
+    Uses Welford's update when a value enters the window and its inverse when the oldest
+    value leaves, so no pass over the window is ever needed.
+    """
+
+    def __init__(self, window):
+        self.window = int(window)
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, x):
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            n = len(self.values)
+            if n:
+                delta = old - self.mean
+                self.mean -= delta / n
+                self.m2 -= delta * (old - self.mean)
+            else:
+                self.mean = self.m2 = 0.0
+        self.values.append(x)
+        delta = x - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (x - self.mean)
+
+    def std(self):
+        n = len(self.values)
+        return math.sqrt(max(self.m2, 0.0) / (n - 1)) if n > 1 else math.nan
+
+
+# -------------------------------
+# Streaming Pairs Engine
+# -------------------------------
+class StreamingPairsEngine:
+    """
+    Bar-by-bar pairs backtest with a rolling Z-Score, for historical replay and live updates.
+
+    The Z-Score of each bar uses only the last `window` valid price ratios up to and including
+    that bar, so no future data enters the signal. Entry, exit, sizing and PnL follow the
+    same rules as engine.backtest_arrays(); feeding it rolling_zscore() gives the same rows.
+    """
+
+    def __init__(self, UB_entry, LB_entry, UB_exit, LB_exit, Amount_Per_Pair=10000, Transaction_Cost=0,
+                 window=60, min_periods=None):
+        """
+        Parameters:
+        - UB_entry, LB_entry, UB_exit, LB_exit: Z-Score thresholds, as in Pairs()
+        - Amount_Per_Pair: Notional split evenly between the two legs on entry
+        - Transaction_Cost: Cost per leg traded
+        - window: Number of price ratios in the rolling Z-Score
+        - min_periods: Ratios needed before a Z-Score is produced (defaults to window)
+        """
+        self.UB_entry = float(UB_entry)
+        self.LB_entry = float(LB_entry)
+        self.UB_exit = float(UB_exit)
+        self.LB_exit = float(LB_exit)
+        self.Amount_Per_Pair = float(Amount_Per_Pair)
+        self.Transaction_Cost = float(Transaction_Cost)
+        self.min_periods = int(window if min_periods is None else min_periods)
+        self.stats = RollingStats(window)
+        self.prev_z = math.nan
+        self.t1_position = self.t2_position = 0
+        self.t1_cash = self.t2_cash = 0.0
+        self.last_date = None
+
+    def zscore(self, price_ratio):
+        """Add one price ratio to the rolling window and return its Z-Score."""
+        if math.isnan(price_ratio):
+            return math.nan
+        self.stats.add(price_ratio)
+        if len(self.stats) < self.min_periods:
+            return math.nan
+        std = self.stats.std()
+        return (price_ratio - self.stats.mean) / std if std > 0 else math.nan
+
+    def update(self, t1_close, t2_close, date=None):
+        """Consume one bar and return its result row, keyed like the Pairs() DataFrame columns."""
+        t1_close, t2_close = float(t1_close), float(t2_close)
+        price_ratio = t1_close / t2_close if t2_close else math.nan
+        z = self.zscore(price_ratio)
+
+        signal = SHORT if z >= self.UB_entry else LONG if z <= -self.LB_entry else FLAT
+        prev = self.prev_z
+        crossed = (prev < -self.LB_exit and z > -self.LB_exit) or (prev > self.UB_exit and z < self.UB_exit)
+
+        p1, p2 = self.t1_position, self.t2_position
+        half = self.Amount_Per_Pair / 2
+        if signal == SHORT:
+            p1 = p1 if p1 < 0 else -int(round(half / t1_close))
+            p2 = p2 if p2 > 0 else int(round(half / t2_close))
+        elif signal == LONG:
+            p1 = p1 if p1 > 0 else int(round(half / t1_close))
+            p2 = p2 if p2 < 0 else -int(round(half / t2_close))
+        elif crossed:
+            p1 = p2 = 0
+
+        t1_trade, t2_trade = p1 - self.t1_position, p2 - self.t2_position
+        transaction_cost = ((t1_trade != 0) + (t2_trade != 0)) * self.Transaction_Cost
+        self.t1_cash -= t1_trade * t1_close
+        self.t2_cash -= t2_trade * t2_close
+        total_cash = self.t1_cash + self.t2_cash - transaction_cost
+        t1_m2m, t2_m2m = t1_close * p1, t2_close * p2
+
+        self.t1_position, self.t2_position = p1, p2
+        self.prev_z = z
+        self.last_date = date
+        return {
+            'T1 Close': t1_close,
+            'T2 Close': t2_close,
+            'Price Ratio': price_ratio,
+            'Z-Score': z,
+            'Signal': SIGNAL_LABELS[signal],
+            'T1 Trade': t1_trade,
+            'T2 Trade': t2_trade,
+            'T1 Position': p1,
+            'T2 Position': p2,
+            'Transaction Cost': transaction_cost,
+            'T1 Trading Cash': self.t1_cash,
+            'T2 Trading Cash': self.t2_cash,
+            'Total Trading Cash': total_cash,
+            'T1 M2M': t1_m2m,
+            'T2 M2M': t2_m2m,
+            'Total M2M': t1_m2m + t2_m2m,
+            'Pnl': total_cash + t1_m2m + t2_m2m,
+        }
+
+    def run(self, bars):
+        """Consume an iterable of (date, t1_close, t2_close) bars, yielding (date, row) as each is processed."""
+        for date, t1_close, t2_close in bars:
+            yield date, self.update(t1_close, t2_close, date)
+
+    def replay(self, t1_close, t2_close):
+        """Stream two close-price Series through the engine, aligned on the dates of the first."""
+        t2_close = t2_close.reindex(t1_close.index)
+        bars = zip(t1_close.index, t1_close.to_numpy().tolist(), t2_close.to_numpy().tolist())
+        rows = [row for _, row in self.run(bars)]
+        frame = pd.DataFrame(rows, index=t1_close.index, columns=COLUMNS)
+        return frame if rows else frame.astype(ROW_DTYPES)
+
+    def snapshot(self):
+        """Return the full engine state as a plain dict that can be stored as JSON."""
+        return {
+            'parameters': [self.UB_entry, self.LB_entry, self.UB_exit, self.LB_exit,
+                           self.Amount_Per_Pair, self.Transaction_Cost, self.stats.window, self.min_periods],
+            'window': list(self.stats.values),
+            'mean': self.stats.mean,
+            'm2': self.stats.m2,
+            'prev_z': self.prev_z,
+            'positions': [self.t1_position, self.t2_position],
+            'cash': [self.t1_cash, self.t2_cash],
+            'last_date': None if self.last_date is None else str(self.last_date),
+        }
+
+    @classmethod
+    def from_snapshot(cls, state):
+        """Rebuild an engine from snapshot() so it continues exactly where it stopped."""
+        engine = cls(*state['parameters'])
+        engine.stats.values.extend(state['window'])
+        engine.stats.mean = state['mean']
+        engine.stats.m2 = state['m2']
+        engine.prev_z = state['prev_z']
+        engine.t1_position, engine.t2_position = state['positions']
+        engine.t1_cash, engine.t2_cash = state['cash']
+        engine.last_date = None if state['last_date'] is None else pd.Timestamp(state['last_date'])
+        return engine
+
+
+# Function to calculate the rolling Z-Score of a whole price ratio series at once
+def rolling_zscore(price_ratio, window=60, min_periods=None):
+    """Vectorized equivalent of the streaming Z-Score, over the last `window` valid ratios."""
+    ratio = pd.Series(price_ratio, dtype='float64')
+    valid = ratio.dropna()
+    rolling = valid.rolling(window, min_periods=window if min_periods is None else min_periods)
+    std = rolling.std()
+    z = ((valid - rolling.mean()) / std.where(std > 0))
+    return z.reindex(ratio.index).to_numpy()
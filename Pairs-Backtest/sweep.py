@@ -0,0 +1,91 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.instrumentation import timed
+from engine import backtest_arrays, calculate_zscore
+from metrics import METRICS, performance_metrics
+from shared_arrays import attach, share
+
+
+PARAMETERS = ['UB_entry', 'LB_entry', 'UB_exit', 'LB_exit', 'Transaction_Cost']
+RESULT_COLUMNS = PARAMETERS + METRICS
+
+
+# Function to build the grid of parameter combinations
+def parameter_grid(UB_entry, LB_entry, UB_exit, LB_exit, Transaction_Cost=(0,)):
+    """Return a DataFrame with one row per combination of the given parameter values."""
+    values = [np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in
+              (UB_entry, LB_entry, UB_exit, LB_exit, Transaction_Cost)]
+    return pd.DataFrame(list(itertools.product(*values)), columns=PARAMETERS)
+
+
+# Function to expand a (low, high) range into evenly spaced sweep values
+def sweep_range(bounds, step):
+    """Values from bounds[0] to bounds[1] inclusive, spaced by step."""
+    return np.arange(bounds[0], bounds[1] + step / 2, step)
+
+
+# Function to evaluate a block of parameter combinations against the same prices
+def evaluate_combos(prices, combos, Amount_Per_Pair):
+    """
+    Backtest every (UB_entry, LB_entry, UB_exit, LB_exit, Transaction_Cost) row of combos.
+
+    prices stacks the aligned close prices and their Z-Score as rows. Returns one tuple of
+    metrics per combo, ordered as metrics.METRICS.
+    """
+    t1_close, t2_close, z_score = prices
+    rows = []
+    for UB_entry, LB_entry, UB_exit, LB_exit, Transaction_Cost in combos:
+        results = backtest_arrays(t1_close, t2_close, UB_entry, LB_entry, UB_exit, LB_exit,
+                                  Amount_Per_Pair, Transaction_Cost, z_score=z_score)
+        metrics = performance_metrics(results['Pnl'], results['T1 Position'], results['T2 Position'],
+                                      t1_close, t2_close, Amount_Per_Pair)
+        rows.append(tuple(metrics.values()))
+    return rows
+
+
+def _evaluate_shared(handle, combos, Amount_Per_Pair):
+    return evaluate_combos(attach(handle), combos, Amount_Per_Pair)
+
+
+# Function to run a parameter sweep over one pair
+@timed('Parameter Sweep', nested=False)
+def run_sweep(t1_close, t2_close, grid, Amount_Per_Pair=10000, max_workers=None, chunk_size=64):
+    """
+    Backtest every row of grid against the same aligned close prices.
+
+    The prices and their Z-Score are written once into a shared memory block that the
+    worker processes map read-only, so each task only carries its parameter rows.
+    Returns the grid with every metrics.METRICS column, ranked by Total PnL.
+    """
+    t1_close = np.asarray(t1_close, dtype=np.float64)
+    t2_close = np.asarray(t2_close, dtype=np.float64)
+    z_score = calculate_zscore(t1_close / t2_close)
+    combos = grid[PARAMETERS].to_numpy().tolist()
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(chunks))
+
+    prices = np.vstack((t1_close, t2_close, z_score))
+    if max_workers <= 1:
+        rows = [row for chunk in chunks for row in evaluate_combos(prices, chunk, Amount_Per_Pair)]
+    else:
+        with share(prices) as handle, ProcessPoolExecutor(max_workers=max_workers) as pool:
+            blocks = pool.map(_evaluate_shared, itertools.repeat(handle), chunks, itertools.repeat(Amount_Per_Pair))
+            rows = [row for block in blocks for row in block]
+
+    results = grid[PARAMETERS].reset_index(drop=True)
+    results[RESULT_COLUMNS[len(PARAMETERS):]] = pd.DataFrame(rows, index=results.index)
+    results['Number of Trades'] = results['Number of Trades'].astype(np.int64)
+    return results.sort_values('Total PnL', ascending=False, kind='stable', ignore_index=True)
+
+
+# Function to pivot sweep results into a 2D grid for a heatmap
+def sweep_heatmap(results, x='UB_entry', y='LB_entry', value='Total PnL'):
+    """Best value for each (y, x) cell, taken over all other swept parameters."""
+    return results.pivot_table(index=y, columns=x, values=value, aggfunc='max')
@@ -0,0 +1,101 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.instrumentation import timed
+from engine import backtest_arrays
+from metrics import METRICS, performance_metrics
+from shared_arrays import attach, share
+from streaming import rolling_zscore
+from sweep import PARAMETERS, evaluate_combos
+
+
+FOLD_COLUMNS = ['Fold', 'In-Sample Start', 'In-Sample End', 'Out-of-Sample Start', 'Out-of-Sample End'] + \
+               PARAMETERS + ['In-Sample PnL', 'Out-of-Sample PnL', 'Out-of-Sample Trades',
+                             'Out-of-Sample Max Drawdown', 'Out-of-Sample Sharpe Ratio']
+
+# Position of the selection metric in the rows of evaluate_combos()
+TOTAL_PNL = METRICS.index('Total PnL')
+
+
+# Function to split a history of n bars into rolling in-sample/out-of-sample folds
+def walk_forward_folds(n, in_sample=504, out_of_sample=126, step=None):
+    """
+    Return (start, split, end) bar positions: fit on [start, split), trade on [split, end).
+
+    Folds advance by step bars (out_of_sample by default), so consecutive out-of-sample
+    windows tile the history after the first in-sample window.
+    """
+    step = out_of_sample if step is None else step
+    return [(start, start + in_sample, min(start + in_sample + out_of_sample, n))
+            for start in range(0, n - in_sample, step)]
+
+
+# Function to fit thresholds on one in-sample window and trade the following out-of-sample window
+def _run_fold(prices, fold, combos, Amount_Per_Pair):
+    start, split, end = fold
+    in_sample = evaluate_combos(prices[:, start:split], combos, Amount_Per_Pair)
+    # Highest in-sample PnL wins, ties going to the earlier grid row as in run_sweep()
+    in_sample_pnl = np.array([row[TOTAL_PNL] for row in in_sample])
+    best = 0 if np.isnan(in_sample_pnl).all() else int(np.nanargmax(in_sample_pnl))
+    t1_close, t2_close, z_score = prices[:, split:end]
+    results = backtest_arrays(t1_close, t2_close, *combos[best][:4], Amount_Per_Pair, combos[best][4],
+                              z_score=z_score)
+    pnl = results['Pnl']
+    metrics = performance_metrics(pnl, results['T1 Position'], results['T2 Position'], t1_close, t2_close,
+                                  Amount_Per_Pair)
+    diagnostics = (*combos[best], in_sample_pnl[best], metrics['Total PnL'], metrics['Number of Trades'],
+                   metrics['Max Drawdown'], metrics['Sharpe Ratio'])
+    return diagnostics, pnl
+
+
+def _run_fold_shared(handle, fold, combos, Amount_Per_Pair):
+    return _run_fold(attach(handle), fold, combos, Amount_Per_Pair)
+
+
+# Function to run a walk-forward optimization over one pair
+@timed('Walk-Forward', nested=False)
+def walk_forward(t1_close, t2_close, grid, in_sample=504, out_of_sample=126, window=60,
+                 Amount_Per_Pair=10000, max_workers=None):
+    """
+    Fit the thresholds of grid on each in-sample window and apply the best to the next
+    out-of-sample window.
+
+    The rolling Z-Score is computed once, incrementally, over the whole history and only
+    uses past bars, so every fold reads the same values without recomputing its window.
+    Prices and Z-Score sit in one shared read-only block; folds run on a process pool.
+    Returns the stitched out-of-sample PnL (NaN before the first out-of-sample bar, each
+    fold continuing from the previous fold's final PnL) and a DataFrame of per-fold
+    diagnostics with bar positions.
+    """
+    t1_close = np.asarray(t1_close, dtype=np.float64)
+    t2_close = np.asarray(t2_close, dtype=np.float64)
+    z_score = rolling_zscore(t1_close / t2_close, window)
+    prices = np.vstack((t1_close, t2_close, z_score))
+    combos = grid[PARAMETERS].to_numpy().tolist()
+    folds = walk_forward_folds(len(t1_close), in_sample, out_of_sample)
+
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(folds))
+    if max_workers <= 1:
+        outcomes = [_run_fold(prices, fold, combos, Amount_Per_Pair) for fold in folds]
+    else:
+        with share(prices) as handle, ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outcomes = list(pool.map(_run_fold_shared, itertools.repeat(handle), folds, itertools.repeat(combos),
+                                     itertools.repeat(Amount_Per_Pair)))
+
+    # Stitch the out-of-sample curves, carrying the realised PnL of each fold into the next
+    stitched = np.full(len(t1_close), np.nan)
+    offset = 0.0
+    rows = []
+    for k, ((start, split, end), (diagnostics, pnl)) in enumerate(zip(folds, outcomes)):
+        stitched[split:end] = offset + pnl
+        offset += np.nan_to_num(pnl[-1])
+        rows.append((k + 1, start, split - 1, split, end - 1, *diagnostics))
+
+    diagnostics = pd.DataFrame(rows, columns=FOLD_COLUMNS)
+    diagnostics['Out-of-Sample Trades'] = diagnostics['Out-of-Sample Trades'].astype(np.int64)
+    return stitched, diagnostics
@@ -0,0 +1,72 @@
+"""
+Reference implementation of the original row-by-row Pairs() backtest.
+
+The rules below are the baseline app's per-leg loops, transcribed onto Python lists so
+that 100k bars finish in well under a second. The benchmark suite uses them as the oracle
+every optimized engine has to reproduce.
+"""
+import pandas as pd
+
+
+# Function to run the original pairs strategy rules one bar at a time
+def reference_pairs(t1_close, t2_close, UB_entry, LB_entry, UB_exit, LB_exit, Amount_Per_Pair=10000,
+                    Transaction_Cost=0):
+    """Return a dict of per-bar lists: 'Z-Score', 'T1 Position', 'T2 Position' and 'Pnl'."""
+    ratio = pd.Series(t1_close) / pd.Series(t2_close)
+    z = ((ratio - ratio.mean()) / ratio.std()).tolist()
+    t1 = [float(x) for x in t1_close]
+    t2 = [float(x) for x in t2_close]
+    half = Amount_Per_Pair / 2
+
+    signal = ['Short Pair' if zi >= UB_entry else 'Long Pair' if zi <= -LB_entry else 'Flat Pair' for zi in z]
+
+    # Each leg runs its own loop, as in the original implementation
+    def leg(close, sign):
+        size = [round(half / c) for c in close]
+        position = [0] * len(close)
+        if signal[0] == 'Short Pair':
+            position[0] = -sign * size[0]
+        elif signal[0] == 'Long Pair':
+            position[0] = sign * size[0]
+        for i in range(1, len(close)):
+            previous = position[i - 1]
+            if previous != 0:
+                if signal[i] == 'Short Pair':
+                    position[i] = previous if sign * previous < 0 else -sign * size[i]
+                elif signal[i] == 'Long Pair':
+                    position[i] = previous if sign * previous > 0 else sign * size[i]
+                elif z[i - 1] < -LB_exit and z[i] > -LB_exit or z[i - 1] > UB_exit and z[i] < UB_exit:
+                    position[i] = 0
+                else:
+                    position[i] = previous
+            else:
+                position[i] = 0 if signal[i] == 'Flat Pair' else (
+                    -sign * size[i] if signal[i] == 'Short Pair' else sign * size[i])
+        return position
+
+    t1_position = leg(t1, 1)
+    t2_position = leg(t2, -1)
+
+    pnl = []
+    t1_cash = t2_cash = 0.0
+    p1 = p2 = 0
+    for i in range(len(t1)):
+        t1_trade = t1_position[i] - p1
+        t2_trade = t2_position[i] - p2
+        p1, p2 = t1_position[i], t2_position[i]
+        cost = ((t1_trade != 0) + (t2_trade != 0)) * Transaction_Cost
+        t1_cash = t1_cash - t1_trade * t1[i]
+        t2_cash = t2_cash - t2_trade * t2[i]
+        pnl.append(t1_cash + t2_cash - cost + (t1[i] * p1 + t2[i] * p2))
+
+    return {'Z-Score': z, 'T1 Position': t1_position, 'T2 Position': t2_position, 'Pnl': pnl}
+
+
+# Function to calculate maximum drawdown one value at a time
+def reference_max_drawdown(pnl):
+    """Largest gap between the running maximum of pnl and pnl."""
+    running_max = max_drawdown = float('-inf')
+    for value in pnl:
+        running_max = max(running_max, value)
+        max_drawdown = max(max_drawdown, running_max - value)
+    return max_drawdown
@@ -0,0 +1,114 @@
+"""
+Startup-time benchmark for the Streamlit apps.
+
+Every app is loaded in a fresh interpreter with Streamlit's AppTest, once cold and once as a
+rerun, against a temporary price store seeded with synthetic bars so nothing touches the
+network. The benchmark fails if running an app imported a heavy library that its first page
+does not need; libraries Streamlit itself already loads (plotly) do not count.
+
+    python benchmarks/startup.py [--json results.json]
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from common.price_store import PriceStore
+from common.providers import InMemoryProvider
+
+
+HEAVY_MODULES = ['yfinance', 'scipy', 'matplotlib', 'plotly']
+
+# Libraries each app must not import before the user asks for something that needs them
+STARTUP_FORBIDDEN = {
+    'Pairs-Backtest/app.py': ['yfinance', 'scipy', 'plotly'],
+    'Black-Scholes/app.py': ['yfinance', 'scipy', 'matplotlib', 'plotly'],
+    'Data-Downloader/app.py': ['yfinance', 'scipy', 'matplotlib', 'plotly'],
+}
+
+# Tickers the apps request on their first page
+STARTUP_TICKERS = ['BRX', 'KIM', 'SPY', 'AAPL']
+
+RUNNER = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+loaded = time.perf_counter()
+preloaded = set(sys.modules)
+app.run()
+first = time.perf_counter()
+app.run()
+rerun = time.perf_counter()
+print(json.dumps({
+    'Streamlit Import': loaded - start,
+    'First Run': first - loaded,
+    'Rerun': rerun - first,
+    'Exceptions': [e.value for e in app.exception],
+    'Imported': [m for m in sys.argv[2:] if m in sys.modules and m not in preloaded],
+}))
+"""
+
+
+# Function to fill a price store with synthetic daily bars for the startup tickers
+def seed_store(root, years=60, seed=0):
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(dt.date.today())
+    index = pd.bdate_range(today - pd.DateOffset(years=years), today)
+    frames = {}
+    for ticker in STARTUP_TICKERS:
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+        frames[ticker] = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                                       'Adj Close': close, 'Volume': 1e6}, index=index)
+    store = PriceStore(root, provider=InMemoryProvider(frames))
+    for ticker in STARTUP_TICKERS:
+        store.get(ticker, dt.date(1900, 1, 1), dt.date.today() + dt.timedelta(days=1))
+
+
+# Function to time the startup of one app in a fresh interpreter
+def measure(app, store):
+    env = dict(os.environ, PRICE_STORE_DIR=str(store))
+    result = subprocess.run([sys.executable, '-c', RUNNER, str(ROOT / app), *HEAVY_MODULES],
+                            capture_output=True, text=True, env=env, cwd=ROOT / Path(app).parent)
+    if result.returncode:
+        raise RuntimeError(f"{app} failed to start:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--json', help="Write the measurements to this file")
+    args = parser.parse_args()
+
+    failures = []
+    results = {}
+    with tempfile.TemporaryDirectory() as store:
+        seed_store(store)
+        for app, forbidden in STARTUP_FORBIDDEN.items():
+            results[app] = measured = measure(app, store)
+            eager = sorted(set(measured['Imported']) & set(forbidden))
+            if eager:
+                failures.append(f"{app} imported {', '.join(eager)} at startup")
+            if measured['Exceptions']:
+                failures.append(f"{app} raised {measured['Exceptions']}")
+
+    print(pd.DataFrame(results).T.to_string())
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if failures:
+        sys.exit("FAILED:\n" + "\n".join(failures))
+
+
+if __name__ == '__main__':
+    main()
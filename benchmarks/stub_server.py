@@ -0,0 +1,130 @@
+"""
+Local HTTP stub of a price API, for exercising the bulk fetch layer without the network.
+
+StubServer serves synthetic daily bars as CSV from a background thread and can inject the
+failures a real API produces: transient 503s, missing tickers and slow responses.
+StubProvider is a PriceProvider that reads from it over a shared HTTP session, so
+fetch_many(), TokenBucket and PriceStore run end to end against real sockets.
+
+    with StubServer(frames, fail_every=5) as server:
+        provider = StubProvider(server.url, session=new_session())
+        report = fetch_many(tickers, lambda ticker: provider.fetch(ticker, start, end))
+"""
+import io
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from common.fetch import new_session
+from common.providers import PriceProvider, normalize_bars
+
+
+class StubServer:
+    """
+    Serves GET /bars/<ticker>?start=YYYY-MM-DD&end=YYYY-MM-DD from {ticker: OHLCV DataFrame}.
+
+    Parameters:
+    - frames: Bars of every known ticker; other tickers get a 404
+    - fail_every: Answer every n-th request with a 503 (0 never fails)
+    - latency: Seconds every response is delayed by
+    """
+
+    def __init__(self, frames, fail_every=0, latency=0.0):
+        self.frames = frames
+        self.fail_every = fail_every
+        self.latency = latency
+        self.requests = Counter()
+        # Encoded responses by (ticker, start, end), so the stub's own CSV writing is not what gets measured
+        self._bodies = {}
+        self._served = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                ticker = url.path.rsplit('/', 1)[-1]
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub._served += 1
+                    stub.requests[ticker] += 1
+                    fail = stub.fail_every and stub._served % stub.fail_every == 0
+                time.sleep(stub.latency)
+
+                frame = stub.frames.get(ticker)
+                if fail:
+                    self._send(503, b'Service Unavailable')
+                elif frame is None:
+                    self._send(404, b'Not Found')
+                else:
+                    key = (ticker, query.get('start', '1900-01-01'), query.get('end', '2262-01-01'))
+                    if key not in stub._bodies:
+                        frame = frame[(frame.index >= pd.Timestamp(key[1])) & (frame.index < pd.Timestamp(key[2]))]
+                        stub._bodies[key] = frame.to_csv().encode()
+                    self._send(200, stub._bodies[key], 'text/csv')
+
+            def _send(self, status, body, content_type='text/plain'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StubProvider(PriceProvider):
+    """
+    Fetches bars from a StubServer, the way YahooProvider fetches them from Yahoo.
+
+    A 404 is an unknown ticker and returns no bars; any other HTTP error is raised, so
+    fetch_many() retries it.
+    """
+
+    def __init__(self, url, session=None, limiter=None, timeout=10):
+        self.url = url
+        self.session = session if session is not None else new_session()
+        self.limiter = limiter
+        self.timeout = timeout
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        if self.limiter is not None:
+            self.limiter.acquire()
+        response = self.session.get(f"{self.url}/bars/{ticker}", timeout=self.timeout, params={
+            'start': pd.Timestamp(start).date().isoformat(), 'end': pd.Timestamp(end).date().isoformat()})
+        if response.status_code == 404:
+            return normalize_bars(None)
+        response.raise_for_status()
+        return normalize_bars(pd.read_csv(io.StringIO(response.text), index_col=0, parse_dates=True))
@@ -0,0 +1,307 @@
+"""
+Offline benchmark suite for the three apps.
+
+Every case runs on deterministic synthetic data (see synthetic.py), is timed over several
+repeats, and is run once more under tracemalloc for its peak memory and the number of
+blocks it allocated. Results are compared against benchmarks/baseline.json: a case that got
+slower or hungrier than the tolerances allow fails the run, and so does any case whose
+output no longer matches its oracle, such as the Pairs PnL of the original row-by-row rules.
+
+    python benchmarks/suite.py [--filter pairs] [--json results.json] [--update-baseline]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+for path in (ROOT, ROOT / 'Pairs-Backtest', ROOT / 'Black-Scholes', ROOT / 'Data-Downloader'):
+    if str(path) not in sys.path:
+        sys.path.append(str(path))
+
+from common.fetch import NoDataError, TokenBucket, fetch_many
+from common.price_store import combine_bars
+from engine import COLUMNS, SIGNAL_LABELS, backtest_arrays, backtest_pair, calculate_max_drawdown
+from export import export_frame
+from pricing import OptionPricingCalculator
+from reference import reference_max_drawdown, reference_pairs
+from streaming import StreamingPairsEngine, rolling_zscore
+from stub_server import StubProvider, StubServer
+from synthetic import cointegrated_pair, correlated_gbm, ohlcv_frame
+
+
+BASELINE = Path(__file__).with_name('baseline.json')
+
+# Measurements recorded for every case
+MEASUREMENTS = ['Wall Time', 'Peak Memory', 'Allocations']
+
+# Pairs parameters every backtest case runs with: UB_entry, LB_entry, UB_exit, LB_exit, Amount_Per_Pair, Transaction_Cost
+PAIRS_PARAMETERS = (1.0, 1.0, 0.5, 0.5, 10000, 1.0)
+
+
+# -------------------------------
+# Cases
+# -------------------------------
+# Every case is a function that builds its inputs and returns (run, check): run() is the
+# measured call, check(result) raises AssertionError if the result is wrong.
+
+def pairs_case(n_bars):
+    def case():
+        t1_close, t2_close = cointegrated_pair(n_bars, seed=n_bars)
+        index = pd.bdate_range('2000-01-03', periods=n_bars)
+        t1_close, t2_close = pd.Series(t1_close, index=index), pd.Series(t2_close, index=index)
+        expected = reference_pairs(t1_close.to_numpy(), t2_close.to_numpy(), *PAIRS_PARAMETERS)
+
+        def check(df):
+            for column in ('T1 Position', 'T2 Position', 'Pnl'):
+                np.testing.assert_array_equal(df[column].to_numpy(), expected[column], err_msg=column)
+            np.testing.assert_allclose(df['Z-Score'].to_numpy(), expected['Z-Score'], rtol=1e-12)
+
+        return lambda: backtest_pair(t1_close, t2_close, *PAIRS_PARAMETERS), check
+    return case
+
+
+def streaming_case(n_bars, window=60, new_bars=250):
+    def case():
+        t1_close, t2_close = cointegrated_pair(n_bars, seed=n_bars + 1)
+        index = pd.bdate_range('2000-01-03', periods=n_bars)
+        t1_close, t2_close = pd.Series(t1_close, index=index), pd.Series(t2_close, index=index)
+        # Oracle: the array engine fed the vectorized rolling Z-Score
+        expected = backtest_arrays(t1_close.to_numpy(), t2_close.to_numpy(), *PAIRS_PARAMETERS,
+                                   z_score=rolling_zscore(t1_close / t2_close, window))
+        expected['Signal'] = SIGNAL_LABELS[expected['Signal']]
+        cold = StreamingPairsEngine(*PAIRS_PARAMETERS, window=window).replay(t1_close, t2_close)
+
+        # The cached run the app resumes from, with its state round-tripped through JSON
+        head = StreamingPairsEngine(*PAIRS_PARAMETERS, window=window)
+        cached = head.replay(t1_close[:-new_bars], t2_close)
+        state = json.loads(json.dumps(head.snapshot()))
+
+        def resume():
+            engine = StreamingPairsEngine.from_snapshot(state)
+            return pd.concat([cached, engine.replay(t1_close[-new_bars:], t2_close),
+                              engine.replay(t1_close[:0], t2_close)])
+
+        def check(df):
+            pd.testing.assert_frame_equal(df, cold)
+            # Signals and positions must match exactly; the running cash sums differ in the last bits
+            for column in COLUMNS:
+                if df[column].dtype == np.float64:
+                    np.testing.assert_allclose(df[column].to_numpy(), expected[column], rtol=1e-9, atol=1e-9,
+                                               err_msg=column)
+                else:
+                    np.testing.assert_array_equal(df[column].to_numpy(), expected[column], err_msg=column)
+
+        return resume, check
+    return case
+
+
+def max_drawdown_case():
+    t1_close, t2_close = cointegrated_pair(100_000, seed=1)
+    pnl = pd.Series(reference_pairs(t1_close, t2_close, *PAIRS_PARAMETERS)['Pnl'])
+    expected = reference_max_drawdown(pnl.tolist())
+
+    def check(max_drawdown):
+        assert max_drawdown == expected, f"max drawdown {max_drawdown} != {expected}"
+
+    return lambda: calculate_max_drawdown(pnl), check
+
+
+def check_parity(result, S, K, T, r, q=0.0):
+    # Put-call parity: C - P = S e^(-qT) - K e^(-rT)
+    np.testing.assert_allclose(result['Call Price'] - result['Put Price'],
+                               S * np.exp(-q * T) - K * np.exp(-r * T), atol=1e-9)
+
+
+def option_scalar_case():
+    S, K, T, r, sigma, q = 100.0, 105.0, 0.75, 0.05, 0.25, 0.01
+    return lambda: OptionPricingCalculator(S, K, T, r, sigma, q).calculate_all(), \
+        lambda result: check_parity(result, S, K, T, r, q)
+
+
+def option_grid_case(resolution):
+    def case():
+        S, sigma = np.meshgrid(np.linspace(50, 150, resolution), np.linspace(0.05, 1.0, resolution))
+        K, T, r, q = 100.0, 1.0, 0.05, 0.02
+        # Spot checks against scalar calculators at a few grid points
+        points = [(0, 0), (resolution // 2, resolution // 3), (resolution - 1, resolution - 1)]
+        expected = {point: OptionPricingCalculator(S[point], K, T, r, sigma[point], q).calculate_all()
+                    for point in points}
+
+        def check(result):
+            check_parity(result, S, K, T, r, q)
+            for point, values in expected.items():
+                for name, value in values.items():
+                    np.testing.assert_allclose(result[name][point], value, rtol=1e-12, err_msg=name)
+
+        return lambda: OptionPricingCalculator(S, K, T, r, sigma, q).calculate_all(), check
+    return case
+
+
+def export_case(fmt, n_tickers=10, n_bars=2520):
+    def case():
+        closes = correlated_gbm(n_bars, n_tickers, seed=2)
+        df = combine_bars({f'T{i:02d}': ohlcv_frame(closes[:, i], seed=i) for i in range(n_tickers)})
+
+        def check(buffer):
+            if fmt == 'CSV':
+                assert buffer.getvalue() == df.to_csv().encode(), "CSV export differs from DataFrame.to_csv()"
+                return
+            read = pd.read_parquet(buffer) if fmt == 'Parquet' else \
+                __import__('pyarrow').ipc.open_file(buffer).read_pandas()
+            np.testing.assert_array_equal(read.to_numpy(), df.to_numpy())
+
+        return lambda: export_frame(df, fmt), check
+    return case
+
+
+def fetch_case(n_tickers=50, n_bars=2520, fail_every=7):
+    closes = correlated_gbm(n_bars, n_tickers, seed=3)
+    frames = {f'T{i:02d}': ohlcv_frame(closes[:, i], seed=i) for i in range(n_tickers)}
+    tickers = list(frames) + ['MISSING']
+    # Every fail_every-th request gets a 503, so some tickers only succeed on a retry
+    server = StubServer(frames, fail_every=fail_every).start()
+    provider = StubProvider(server.url, limiter=TokenBucket(rate=10_000, capacity=100))
+    start, end = frames['T00'].index[0], frames['T00'].index[-1] + pd.Timedelta(days=1)
+
+    def fetch(ticker):
+        bars = provider.fetch(ticker, start, end)
+        if bars.empty:
+            raise NoDataError("No price data found")
+        return bars
+
+    def check(report):
+        assert list(report.errors) == ['MISSING'], f"unexpected errors {report.errors}"
+        assert max(report.attempts.values()) > 1, "no request was retried"
+        for ticker, frame in frames.items():
+            np.testing.assert_allclose(report.results[ticker].to_numpy(), frame.to_numpy(), rtol=1e-12,
+                                       err_msg=ticker)
+
+    return lambda: fetch_many(tickers, fetch, backoff=0.001), check
+
+
+CASES = {
+    'pairs/backtest-1k': pairs_case(1_000),
+    'pairs/backtest-10k': pairs_case(10_000),
+    'pairs/backtest-100k': pairs_case(100_000),
+    'pairs/max-drawdown-100k': max_drawdown_case,
+    'pairs/streaming-resume-5k': streaming_case(5_000),
+    'black-scholes/scalar': option_scalar_case,
+    'black-scholes/grid-100x100': option_grid_case(100),
+    'black-scholes/grid-500x500': option_grid_case(500),
+    'data-downloader/export-csv': export_case('CSV'),
+    'data-downloader/export-parquet': export_case('Parquet'),
+    'data-downloader/export-arrow': export_case('Arrow IPC'),
+    'data-downloader/fetch-stub-50': fetch_case,
+}
+
+
+# -------------------------------
+# Measurement
+# -------------------------------
+def measure(run, repeat=5, min_time=0.05):
+    """
+    Time run() and trace its memory.
+
+    Wall Time is the best per-call time over repeat rounds, each round calling run() often
+    enough to take at least min_time seconds. Peak Memory (bytes above the starting level)
+    and Allocations (memory blocks the call left allocated, mostly its result and any caches
+    it filled) come from one extra call under tracemalloc.
+    """
+    start = time.perf_counter()
+    result = run()
+    number = max(1, int(min_time / max(time.perf_counter() - start, 1e-9)))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        timings.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        traced = run()
+        peak = tracemalloc.get_traced_memory()[1] - base
+        allocations = sum(stat.count_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'lineno')
+                          if stat.count_diff > 0)
+        del traced
+    finally:
+        tracemalloc.stop()
+    return result, {'Wall Time': min(timings), 'Peak Memory': peak, 'Allocations': allocations}
+
+
+# Function to compare measurements with the baseline
+def regressions(results, baseline, time_tolerance=1.0, memory_tolerance=0.2):
+    """
+    Messages for every measurement that exceeds its baseline by more than its tolerance.
+
+    Small absolute differences (under 1 ms or 64 KiB) never fail, so tiny cases do not
+    flap with timer and allocator noise.
+    """
+    floors = {'Wall Time': 1e-3, 'Peak Memory': 64 * 1024, 'Allocations': 100}
+    messages = []
+    for name, measured in results.items():
+        if name not in baseline:
+            continue
+        for key in MEASUREMENTS:
+            tolerance = time_tolerance if key == 'Wall Time' else memory_tolerance
+            old, new = baseline[name][key], measured[key]
+            if new > old * (1 + tolerance) and new - old > floors[key]:
+                messages.append(f"{name}: {key} {new:.4g} vs baseline {old:.4g} (+{new / old - 1:.0%})")
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filter', default='', help="Only run cases whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing rounds per case")
+    parser.add_argument('--time-tolerance', type=float, default=1.0, help="Allowed wall time increase (1.0 = twice as slow)")
+    parser.add_argument('--memory-tolerance', type=float, default=0.2, help="Allowed memory increase (0.2 = 20%%)")
+    parser.add_argument('--baseline', type=Path, default=BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="Write the measurements to the baseline")
+    parser.add_argument('--json', help="Write the measurements to this file")
+    args = parser.parse_args()
+
+    failures = []
+    results = {}
+    for name, case in CASES.items():
+        if args.filter not in name:
+            continue
+        run, check = case()
+        result, results[name] = measure(run, args.repeat)
+        try:
+            check(result)
+        except AssertionError as error:
+            failures.append(f"{name}: wrong result: {error}")
+
+    print(pd.DataFrame(results).T.to_string(formatters={
+        'Wall Time': lambda s: f"{s * 1e3:.3f} ms",
+        'Peak Memory': lambda b: f"{b / 2 ** 20:.2f} MiB",
+        'Allocations': lambda n: f"{int(n):,}",
+    }))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2) + '\n')
+    elif args.baseline.exists():
+        failures += regressions(results, json.loads(args.baseline.read_text()),
+                                args.time_tolerance, args.memory_tolerance)
+    else:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+
+    if failures:
+        sys.exit("FAILED:\n" + "\n".join(failures))
+
+
+if __name__ == '__main__':
+    main()
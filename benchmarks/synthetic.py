@@ -0,0 +1,67 @@
+"""
+Deterministic synthetic market data for the benchmarks.
+
+Every generator takes a seed, so the same arguments always produce the same prices and a
+benchmark run never needs the network.
+"""
+import numpy as np
+import pandas as pd
+
+
+# Function to simulate correlated geometric Brownian motion price paths
+def correlated_gbm(n_bars, n_assets=2, correlation=0.8, mu=0.05, sigma=0.2, S0=100.0, seed=0,
+                   periods_per_year=252):
+    """
+    Return an (n_bars, n_assets) array of prices whose log returns share one pairwise correlation.
+
+    Parameters:
+    - n_bars: Number of bars per asset
+    - n_assets: Number of assets
+    - correlation: Correlation of every pair of log returns
+    - mu, sigma: Annual drift and volatility of every asset
+    - S0: Starting price
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / periods_per_year
+    cov = np.full((n_assets, n_assets), correlation) + (1 - correlation) * np.eye(n_assets)
+    shocks = rng.standard_normal((n_bars, n_assets)) @ np.linalg.cholesky(cov).T
+    log_returns = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * shocks
+    log_returns[0] = 0.0
+    return S0 * np.exp(np.cumsum(log_returns, axis=0))
+
+
+# Function to simulate a cointegrated pair of prices
+def cointegrated_pair(n_bars, hedge_ratio=1.0, half_life=20, spread_sigma=0.02, sigma=0.2, S0=50.0, seed=0,
+                      periods_per_year=252):
+    """
+    Return two price arrays whose log spread is a mean-reverting Ornstein-Uhlenbeck process.
+
+    The first leg is a GBM; the second is exp(hedge_ratio * log(first) + spread), so the
+    price ratio crosses the usual Z-Score bands many times over any sample.
+    """
+    rng = np.random.default_rng(seed)
+    t1_close = correlated_gbm(n_bars, 1, 0.0, 0.0, sigma, S0, rng.integers(2 ** 32), periods_per_year)[:, 0]
+    phi = 0.5 ** (1.0 / half_life)
+    noise = rng.normal(0.0, spread_sigma * np.sqrt(1 - phi ** 2), n_bars)
+    spread = np.empty(n_bars)
+    spread[0] = noise[0]
+    for i in range(1, n_bars):
+        spread[i] = phi * spread[i - 1] + noise[i]
+    t2_close = np.exp(hedge_ratio * np.log(t1_close) + spread)
+    return t1_close, t2_close
+
+
+# Function to wrap price arrays in the OHLCV layout the price store returns
+def ohlcv_frame(close, start='2000-01-03', seed=0):
+    """Daily OHLCV DataFrame around close on business days from start."""
+    rng = np.random.default_rng(seed)
+    close = np.asarray(close, dtype=np.float64)
+    wiggle = 1 + np.abs(rng.normal(0, 0.005, (2, len(close))))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.002, len(close))),
+        'High': close * wiggle[0],
+        'Low': close / wiggle[1],
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(1e5, 1e7, len(close)).astype(np.float64),
+    }, index=pd.bdate_range(start, periods=len(close), name='Date'))
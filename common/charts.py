@@ -0,0 +1,170 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from common.instrumentation import count, timed
+
+
+# Points kept per series; a 10 inch figure at 100 dpi is 1,000 pixels wide
+MAX_POINTS = 2000
+
+# Rendered charts kept in memory: digest -> PNG bytes
+CACHE_SIZE = 64
+_png_cache = OrderedDict()
+# Sessions render on their own script threads; the lock guards the cache, not the render
+_png_lock = threading.Lock()
+
+
+# -------------------------------
+# Decimation
+# -------------------------------
+def minmax_indices(y, max_points=MAX_POINTS):
+    """
+    Indices of the minimum and maximum of each of max_points // 2 equal buckets of y.
+
+    Keeps every spike and trough that would be visible at screen resolution; the first and
+    last points are always kept. Missing values are never picked unless a bucket is all missing.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    buckets = max(max_points // 2, 1)
+    if n <= max_points:
+        return np.arange(n)
+
+    width = -(-n // buckets)
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    low = np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1) + offsets
+    high = np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1) + offsets
+    keep = np.concatenate(([0], low, high, [n - 1]))
+    return np.unique(keep[keep < n])
+
+
+def lttb_indices(y, max_points=MAX_POINTS):
+    """
+    Indices picked by Largest-Triangle-Three-Buckets over evenly spaced points of y.
+
+    Each bucket keeps the point forming the largest triangle with the previous pick and the
+    mean of the next bucket, which preserves the visual shape of the line.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    y = np.where(np.isnan(y), 0.0, y)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for k in range(max_points - 2):
+        start, stop = edges[k], edges[k + 1]
+        next_stop = edges[k + 2] if k + 2 < len(edges) else n
+        next_x = (stop + next_stop - 1) / 2
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        x = np.arange(start, stop)
+        area = np.abs((previous - next_x) * (y[start:stop] - y[previous]) - (previous - x) * (next_y - y[previous]))
+        previous = keep[k + 1] = start + int(np.argmax(area))
+    return keep
+
+
+DECIMATION_METHODS = {'minmax': minmax_indices, 'lttb': lttb_indices}
+
+
+def decimate(series, max_points=MAX_POINTS, method='minmax'):
+    """Return series reduced to about max_points points with the chosen decimation method."""
+    series = series.dropna()
+    return series.iloc[DECIMATION_METHODS[method](series.to_numpy(), max_points)]
+
+
+@timed('Decimate')
+def decimate_frame(frame, max_points=MAX_POINTS, method='minmax'):
+    """Decimate every column of frame and keep the union of the picked rows, for interactive charts."""
+    rows = np.unique(np.concatenate(
+        [DECIMATION_METHODS[method](frame[column].to_numpy(dtype=np.float64), max_points) for column in frame]))
+    return frame.iloc[rows]
+
+
+# -------------------------------
+# Rendering
+# -------------------------------
+def digest(*parts):
+    """Stable hash of DataFrames, Series, arrays and plain values, used as a cache key."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+            h.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+        elif isinstance(part, np.ndarray):
+            h.update(np.ascontiguousarray(part).tobytes())
+            h.update(repr((part.shape, part.dtype.str)).encode())
+        else:
+            h.update(repr(part).encode())
+    return h.hexdigest()
+
+
+@timed('Render Chart')
+def figure_png(fig, dpi=100):
+    """Render a matplotlib figure to PNG bytes and release the figure."""
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+@timed('Render Chart')
+def line_chart_png(series, title=None, xlabel=None, ylabel=None, hlines=(), styles=None, figsize=(10, 6),
+                   max_points=MAX_POINTS, method='minmax'):
+    """
+    Render one or more lines to PNG bytes, decimated to screen resolution.
+
+    series maps a legend label to a pandas Series; styles maps a label to plot keyword
+    arguments and hlines is a sequence of (y, keyword arguments) horizontal lines. Charts are
+    cached by a digest of every input, so a rerun with unchanged data costs one hash.
+    """
+    styles = styles or {}
+    key = digest(*series.values(), list(series), title, xlabel, ylabel, hlines, styles, figsize, max_points, method)
+    with _png_lock:
+        png = _png_cache.get(key)
+        if png is not None:
+            _png_cache.move_to_end(key)
+    if png is not None:
+        count('Chart Cache Hits')
+        return png
+    count('Chart Cache Misses')
+
+    # A bare Figure is never registered with pyplot, so nothing outlives the render
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    for label, values in series.items():
+        values = decimate(values, max_points, method)
+        ax.plot(values.index, values.to_numpy(), label=label, **styles.get(label, {}))
+    for y, kwargs in hlines:
+        ax.axhline(y, **kwargs)
+    if title:
+        ax.set_title(title)
+    if xlabel:
+        ax.set_xlabel(xlabel)
+    if ylabel:
+        ax.set_ylabel(ylabel)
+    ax.legend()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    fig.clear()
+    png = buffer.getvalue()
+    with _png_lock:
+        _png_cache[key] = png
+        if len(_png_cache) > CACHE_SIZE:
+            _png_cache.popitem(last=False)
+    return png
@@ -0,0 +1,115 @@
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from common.instrumentation import count, span
+
+
+class NoDataError(Exception):
+    """Raised by a fetch function when a key has no data; it is reported but not retried."""
+
+
+class TokenBucket:
+    """
+    A thread-safe token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`; acquire() takes one
+    token, sleeping until one is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FetchReport:
+    """
+    Outcome of a bulk fetch: results for the keys that succeeded and an error per key that failed.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.attempts = {}
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def error_frame(self):
+        """One row per failed key with its error message and number of attempts."""
+        return pd.DataFrame(
+            [(key, message, self.attempts[key]) for key, message in self.errors.items()],
+            columns=['Key', 'Error', 'Attempts'],
+        )
+
+
+# Function to create an HTTP session that can be shared by every worker thread
+def new_session():
+    """Return a curl_cffi session when available (what yfinance prefers), else a requests session."""
+    try:
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate="chrome")
+    except ImportError:
+        import requests
+        return requests.Session()
+
+
+# Function to fetch many keys concurrently with per-key retries
+def fetch_many(keys, fetch, max_workers=8, retries=3, backoff=0.5):
+    """
+    Call fetch(key) for every key on a bounded thread pool and collect partial results.
+
+    Parameters:
+    - keys: Iterable of hashable keys (tickers, or (ticker, statement) tuples)
+    - fetch: Function taking a key and returning its data; raise NoDataError for a permanent miss
+    - max_workers: Size of the thread pool
+    - retries: Extra attempts after the first failure of a key
+    - backoff: Base delay in seconds, doubled on every retry with random jitter
+    """
+    keys = list(dict.fromkeys(keys))
+    report = FetchReport()
+
+    def run(key):
+        for attempt in range(retries + 1):
+            report.attempts[key] = attempt + 1
+            try:
+                with span('Fetch', key=str(key), attempt=attempt + 1):
+                    return key, fetch(key), None
+            except NoDataError as error:
+                return key, None, str(error) or 'No data found'
+            except Exception as error:
+                if attempt == retries:
+                    return key, None, f"{type(error).__name__}: {error}"
+                count('Fetch Retries')
+                time.sleep(backoff * 2 ** attempt * (0.5 + random.random()))
+
+    # Every key runs in a copy of the caller's context, so its profiling span reaches the caller's profiler
+    contexts = [contextvars.copy_context() for _ in keys]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(keys) or 1))) as pool:
+        for key, result, error in pool.map(lambda context, key: context.run(run, key), contexts, keys):
+            if error is None:
+                report.results[key] = result
+            else:
+                report.errors[key] = error
+
+    return report
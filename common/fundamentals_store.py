@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common.fetch import fetch_many
+from common.price_store import DEFAULT_ROOT, file_lock
+from common.providers import FUNDAMENTAL_FIELDS, fetch_fundamentals
+
+
+# On-disk record layout: one row per ticker, one column per field
+TICKER_LENGTH = 32
+FUNDAMENTALS_DTYPE = np.dtype([('Ticker', f'U{TICKER_LENGTH}')] +
+                              [(field, 'float64') for field in FUNDAMENTAL_FIELDS] + [('Refreshed', 'float64')])
+
+
+class FundamentalsStore:
+    """
+    A persistent, columnar store of per-ticker valuation fundamentals.
+
+    All tickers live in one memory-mapped .npy table sorted by ticker, so a query over a whole
+    universe is a handful of array operations with no network access. refresh() fetches only
+    the tickers that are missing or older than max_age, and merges them into the table under
+    a lock file, so refreshes from other processes are never overwritten.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, fetch=None, max_age=86400):
+        """
+        Parameters:
+        - root: Directory holding the store file
+        - fetch: Function taking a ticker and returning a {field: value} dict (Yahoo Finance by default)
+        - max_age: Seconds before a ticker's fundamentals are fetched again
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / 'fundamentals.npy'
+        self.fetch = fetch if fetch is not None else fetch_fundamentals
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            records = np.load(self.path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return np.empty(0, dtype=FUNDAMENTALS_DTYPE)
+        # Tables written with a narrower Ticker field are widened on read
+        return records if records.dtype == FUNDAMENTALS_DTYPE else records.astype(FUNDAMENTALS_DTYPE)
+
+    def _write(self, records):
+        # Write to a temporary file and rename, so readers in other sessions never see a partial file
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'wb') as f:
+            np.save(f, records)
+        os.replace(tmp, self.path)
+
+    def get(self, tickers=None):
+        """Return the stored fundamentals of tickers (every stored ticker if None), indexed by Ticker."""
+        records = self._read()
+        if tickers is not None:
+            records = records[np.isin(records['Ticker'], [ticker.upper() for ticker in tickers])]
+        frame = pd.DataFrame({field: np.asarray(records[field]) for field in FUNDAMENTALS_DTYPE.names[1:]},
+                             index=pd.Index(np.asarray(records['Ticker']), name='Ticker'))
+        frame['Refreshed'] = pd.to_datetime(frame['Refreshed'], unit='s')
+        return frame
+
+    def stale(self, tickers):
+        """Tickers that are not stored or were refreshed more than max_age seconds ago."""
+        records = self._read()
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        fresh = set(records['Ticker'][records['Refreshed'] > time.time() - self.max_age].tolist())
+        return [ticker for ticker in tickers if ticker not in fresh]
+
+    def refresh(self, tickers, force=False, **kwargs):
+        """
+        Fetch the fundamentals of the stale tickers (all of them if force) and store them.
+
+        Extra keyword arguments go to fetch_many(). Returns its FetchReport.
+        """
+        tickers = [ticker.upper() for ticker in tickers] if force else self.stale(tickers)
+        too_long = [ticker for ticker in tickers if len(ticker) > TICKER_LENGTH]
+        if too_long:
+            raise ValueError(f"Tickers longer than {TICKER_LENGTH} characters cannot be stored: {too_long}")
+        report = fetch_many(tickers, self.fetch, **kwargs)
+        if not report.results:
+            return report
+
+        fetched = np.empty(len(report.results), dtype=FUNDAMENTALS_DTYPE)
+        fetched['Ticker'] = list(report.results)
+        for field in FUNDAMENTAL_FIELDS:
+            fetched[field] = [values.get(field, np.nan) for values in report.results.values()]
+        fetched['Refreshed'] = time.time()
+
+        # The thread lock serializes sessions of this process, the lock file other processes
+        with self._lock, file_lock(self.path.with_suffix('.lock')):
+            records = np.array(self._read())
+            # Keep the newest copy of each ticker: fetched records come first in the merge
+            merged = np.concatenate((fetched, records))
+            _, first = np.unique(merged['Ticker'], return_index=True)
+            self._write(merged[first])
+        return report
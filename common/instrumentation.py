@@ -0,0 +1,291 @@
+import contextvars
+import functools
+import json
+import os
+import socket
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+
+# Columns of Profiler.frame(), one row per recorded span
+SPAN_COLUMNS = ['Run', 'Name', 'Start', 'Duration', 'Memory Delta', 'Thread']
+
+# Profiler that span(), timed() and count() report to in the current context, if any
+_active = contextvars.ContextVar('profiler', default=None)
+
+# tracemalloc is process-wide, so it runs while any profiler traces memory and stops with the last one
+_memory_users = 0
+_memory_started = False
+_memory_lock = threading.Lock()
+
+
+def _acquire_tracing():
+    global _memory_users, _memory_started
+    with _memory_lock:
+        _memory_users += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _memory_started = True
+
+
+def _release_tracing():
+    global _memory_users, _memory_started
+    with _memory_lock:
+        _memory_users -= 1
+        # Tracing started by someone else (a benchmark, a debugger) is left running
+        if _memory_users == 0 and _memory_started:
+            tracemalloc.stop()
+            _memory_started = False
+
+
+class Profiler:
+    """
+    Named timing spans and counters for one app session, grouped by rerun.
+
+    Spans are recorded only while the profiler is active (see activate() and begin_run()),
+    so the span() and timed() hooks left in the hot paths cost one context lookup otherwise.
+    With trace_memory, every span also records the change in memory traced by tracemalloc,
+    which slows Python allocations down noticeably while it is on.
+    """
+
+    def __init__(self, trace_memory=False, max_spans=20_000):
+        """
+        Parameters:
+        - trace_memory: Record the tracemalloc memory delta (bytes) of every span
+        - max_spans: Spans kept; the oldest are dropped first
+        """
+        self._memory_release = None
+        self.trace_memory = trace_memory
+        self.spans = deque(maxlen=max_spans)
+        self.counters = Counter()
+        self.runs = []
+        self._epoch = time.time() - time.perf_counter()
+        self._lock = threading.Lock()
+        self._run_start = None
+
+    @property
+    def run(self):
+        return len(self.runs)
+
+    @property
+    def trace_memory(self):
+        return self._memory_release is not None
+
+    @trace_memory.setter
+    def trace_memory(self, value):
+        # Each tracing profiler holds one reference on tracemalloc, released when it stops or is collected
+        if value and self._memory_release is None:
+            _acquire_tracing()
+            self._memory_release = weakref.finalize(self, _release_tracing)
+        elif not value and self._memory_release is not None:
+            self._memory_release()
+            self._memory_release = None
+
+    @contextmanager
+    def activate(self):
+        """Make this the profiler of the current context for the duration of the block."""
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def begin_run(self):
+        """Activate the profiler for the rest of the current script run and start timing it."""
+        _active.set(self)
+        self._run_start = time.perf_counter()
+
+    def end_run(self):
+        """Record the run as a 'Rerun' span, with the counters as they stand at its end."""
+        if self._run_start is None:
+            return
+        self._record('Rerun', self._run_start, time.perf_counter(), None)
+        self.runs.append({'Run': self.run, 'Start': self._epoch + self._run_start, 'Counters': dict(self.counters)})
+        self._run_start = None
+
+    @contextmanager
+    def span(self, name, **args):
+        """Time the block as one span called name; args are kept with it in the trace."""
+        memory = tracemalloc.get_traced_memory()[0] if self.trace_memory and tracemalloc.is_tracing() else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            delta = tracemalloc.get_traced_memory()[0] - memory if memory is not None else None
+            self._record(name, start, end, delta, args)
+
+    def _record(self, name, start, end, memory_delta, args=None):
+        with self._lock:
+            self.spans.append({'Run': self.run, 'Name': name, 'Start': self._epoch + start, 'Duration': end - start,
+                               'Memory Delta': memory_delta, 'Thread': threading.get_ident(), 'Args': args or {}})
+
+    def count(self, name, n=1):
+        """Add n to the counter called name."""
+        with self._lock:
+            self.counters[name] += n
+
+    def bind(self, function):
+        """Wrap function so it reports to this profiler wherever it is called later, e.g. by a download button."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.activate():
+                return function(*args, **kwargs)
+        return wrapper
+
+    def clear(self):
+        self.spans.clear()
+        self.counters.clear()
+        self.runs.clear()
+
+    def frame(self, run=None):
+        """Recorded spans as a DataFrame with SPAN_COLUMNS, only those of one run if given."""
+        frame = pd.DataFrame(list(self.spans), columns=SPAN_COLUMNS).astype({'Memory Delta': 'float64'})
+        return frame[frame['Run'] == run].reset_index(drop=True) if run is not None else frame
+
+    def summary(self, run=None):
+        """Calls, total, mean and max duration (ms) and total memory delta (bytes) of every span name."""
+        frame = self.frame(run)
+        frame['Duration'] *= 1e3
+        summary = frame.groupby('Name', sort=False).agg(
+            **{'Calls': ('Duration', 'size'), 'Total (ms)': ('Duration', 'sum'), 'Mean (ms)': ('Duration', 'mean'),
+               'Max (ms)': ('Duration', 'max'), 'Memory Delta': ('Memory Delta', lambda m: m.sum(min_count=1))})
+        return summary.sort_values('Total (ms)', ascending=False)
+
+    def metadata(self):
+        # Where the numbers came from, so exports from several deployments can be told apart
+        return {'Host': socket.gethostname(), 'PID': os.getpid(), 'Exported': time.time(), 'Runs': len(self.runs)}
+
+    def to_json(self):
+        """Every span, run and counter as a JSON document; times are Unix seconds."""
+        return json.dumps({**self.metadata(), 'Counters': dict(self.counters), 'Run History': self.runs,
+                           'Spans': list(self.spans)}, default=str, indent=2)
+
+    def to_chrome_trace(self):
+        """
+        Every span as a Chrome trace (chrome://tracing, Perfetto) JSON document.
+
+        Spans are complete ('X') events on the thread that ran them; the counters at the end of
+        every run are counter ('C') events.
+        """
+        pid = os.getpid()
+        events = [{'name': span['Name'], 'cat': f"run {span['Run']}", 'ph': 'X', 'pid': pid, 'tid': span['Thread'],
+                   'ts': span['Start'] * 1e6, 'dur': span['Duration'] * 1e6,
+                   'args': {**span['Args'], **({'Memory Delta': span['Memory Delta']}
+                                               if span['Memory Delta'] is not None else {})}}
+                  for span in self.spans]
+        events += [{'name': 'Counters', 'ph': 'C', 'pid': pid, 'ts': run['Start'] * 1e6, 'args': run['Counters']}
+                   for run in self.runs if run['Counters']]
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.metadata()}, default=str)
+
+
+# -------------------------------
+# Hooks
+# -------------------------------
+def active():
+    """The profiler of the current context, or None."""
+    return _active.get()
+
+
+def span(name, **args):
+    """Time a block as a span of the active profiler; does nothing when none is active."""
+    profiler = _active.get()
+    return profiler.span(name, **args) if profiler is not None else nullcontext()
+
+
+def timed(name, nested=True):
+    """
+    Decorator recording every call of the function as a span called name.
+
+    With nested=False the spans and counters of everything the call runs are left out, for
+    batch functions (sweeps, walk-forward) whose inner calls would otherwise record one span
+    per grid point inline but none at all when they run in worker processes.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _active.get()
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.span(name):
+                if nested:
+                    return function(*args, **kwargs)
+                token = _active.set(None)
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    _active.reset(token)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """Add n to a counter of the active profiler; does nothing when none is active."""
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def bind_profiler(function):
+    """function bound to the active profiler (see Profiler.bind), or function itself when none is active."""
+    profiler = _active.get()
+    return profiler.bind(function) if profiler is not None else function
+
+
+# -------------------------------
+# Sidebar Panel
+# -------------------------------
+def start_profiling(key='profiler'):
+    """
+    Start profiling this script run if the sidebar's "Profile reruns" toggle is on.
+
+    Call at the top of the app, and profiler_panel() at the end. The profiler lives in
+    st.session_state[key], so it collects every rerun of the session.
+    """
+    import streamlit as st
+
+    if not st.session_state.get(f'{key}_enabled'):
+        # A profiler activated by an earlier run must not keep recording, or keep memory tracing on
+        _active.set(None)
+        if st.session_state.get(key) is not None:
+            st.session_state[key].trace_memory = False
+        return None
+    profiler = st.session_state.get(key)
+    if profiler is None:
+        profiler = st.session_state[key] = Profiler()
+    profiler.trace_memory = bool(st.session_state.get(f'{key}_memory'))
+    profiler.begin_run()
+    return profiler
+
+
+def profiler_panel(profiler, key='profiler'):
+    """Close the run started by start_profiling() and show its spans, counters and exports in the sidebar."""
+    import streamlit as st
+
+    if profiler is not None:
+        profiler.end_run()
+
+    with st.sidebar.expander("Profiling"):
+        st.toggle("Profile reruns", key=f'{key}_enabled')
+        st.checkbox("Trace memory (slower)", key=f'{key}_memory')
+        if profiler is None:
+            st.caption("Turn on to time every stage of the next reruns.")
+            return
+        st.caption(f"Run {profiler.run} of this session")
+        st.dataframe(profiler.summary(profiler.run - 1), column_config={
+            'Memory Delta': st.column_config.NumberColumn(format="compact"),
+        })
+        if profiler.counters:
+            st.dataframe(pd.Series(profiler.counters, name='Count').sort_index())
+        st.download_button("Download JSON", profiler.to_json, file_name='profile.json', mime='application/json',
+                           on_click="ignore")
+        st.download_button("Download Chrome Trace", profiler.to_chrome_trace, file_name='profile.trace.json',
+                           mime='application/json', on_click="ignore")
+        if st.button("Clear Profile"):
+            profiler.clear()
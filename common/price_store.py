@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common.instrumentation import count, span
+from common.providers import OHLCV_COLUMNS, YahooProvider
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the threads of one process are serialized
+    fcntl = None
+
+
+# Default location shared by every app on the machine
+DEFAULT_ROOT = Path(os.environ.get('PRICE_STORE_DIR', Path.home() / '.cache' / 'price_store'))
+
+# On-disk record layout: one row per bar
+BAR_DTYPE = np.dtype([('Date', 'datetime64[ns]')] + [(column, 'float64') for column in OHLCV_COLUMNS])
+
+
+class PriceStore:
+    """
+    A persistent, per-ticker OHLCV store in front of a price provider.
+
+    Bars are kept as one memory-mapped .npy file per (ticker, interval) with a JSON sidecar
+    recording the date range that has been fetched. A request only goes to the provider for
+    the part of its range that is not covered yet; everything else is read from disk.
+
+    Every fetch overlaps one stored bar. If Yahoo's Adj Close / Close factor on that bar has
+    changed (a dividend or split since the bars were stored), the whole covered range is
+    fetched again instead of stitching differently adjusted bars together. A lock file per
+    (ticker, interval) keeps processes sharing the directory from interleaving their writes.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, provider=None, max_age=3600):
+        """
+        Parameters:
+        - root: Directory holding the store files
+        - provider: PriceProvider used to fill gaps (Yahoo Finance by default)
+        - max_age: Seconds before bars up to the present are fetched again
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.provider = provider if provider is not None else YahooProvider()
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _paths(self, ticker, interval):
+        name = f"{ticker.upper().replace('/', '_')}_{interval}"
+        return self.root / f"{name}.npy", self.root / f"{name}.json"
+
+    @contextmanager
+    def _lock(self, ticker, interval):
+        with self._locks_guard:
+            lock = self._locks.setdefault((ticker.upper(), interval), threading.Lock())
+        # The thread lock serializes this process, the lock file every other process
+        with lock, file_lock(self._paths(ticker, interval)[0].with_suffix('.lock')):
+            yield
+
+    def _read(self, ticker, interval):
+        data_path, meta_path = self._paths(ticker, interval)
+        try:
+            meta = json.loads(meta_path.read_text())
+            bars = np.load(data_path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None, None
+        return bars, meta
+
+    def _write(self, ticker, interval, bars, meta):
+        data_path, meta_path = self._paths(ticker, interval)
+        # Write to temporary files and rename, so readers in other sessions never see a partial file
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        data_tmp = data_path.with_name(data_path.name + suffix)
+        meta_tmp = meta_path.with_name(meta_path.name + suffix)
+        with open(data_tmp, 'wb') as f:
+            np.save(f, bars)
+        meta_tmp.write_text(json.dumps(meta))
+        os.replace(data_tmp, data_path)
+        os.replace(meta_tmp, meta_path)
+
+    def get(self, ticker, start, end, interval='1d'):
+        """Return bars for ticker with start <= date < end, fetching only the uncovered range."""
+        start = pd.Timestamp(start).as_unit('ns')
+        end = pd.Timestamp(end).as_unit('ns')
+        with self._lock(ticker, interval):
+            bars, meta = self._read(ticker, interval)
+            gaps = self._gaps(meta, start, end)
+            if gaps:
+                self.misses += 1
+                count('Price Store Misses')
+                with span('Price Store Fill', ticker=ticker):
+                    bars, meta = self._fill(ticker, interval, bars, meta, gaps)
+            else:
+                self.hits += 1
+                count('Price Store Hits')
+        return _to_frame(bars, start, end)
+
+    def get_many(self, tickers, start, end, interval='1d'):
+        """
+        Return bars for several tickers, laid out like yf.download: flat columns for one
+        ticker, (Price, Ticker) columns for more than one.
+        """
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        return combine_bars({ticker: self.get(ticker, start, end, interval) for ticker in tickers})
+
+    def _gaps(self, meta, start, end):
+        """Date ranges in [start, end) that still need to be fetched."""
+        if meta is None:
+            return [(start, end)]
+        covered_start = pd.Timestamp(meta['start'])
+        covered_end = pd.Timestamp(meta['end'])
+        gaps = []
+        if start < covered_start:
+            gaps.append((start, covered_start))
+        tail_start = covered_end if end > covered_end else None
+        # Today's bar is still forming, so it is fetched again once the store is stale
+        today = pd.Timestamp.today().normalize()
+        if covered_end > today and end > today and time.time() - meta['refreshed'] > self.max_age:
+            tail_start = today if tail_start is None else min(tail_start, today)
+        if tail_start is not None:
+            gaps.append((tail_start, end))
+        return gaps
+
+    def _fill(self, ticker, interval, bars, meta, gaps):
+        if bars is not None and len(bars):
+            # Widen every gap by one stored bar, so the adjustment can be compared across the seam
+            first, last = pd.Timestamp(bars['Date'][0]), pd.Timestamp(bars['Date'][-1])
+            gaps = [(min(gap_start, last) if gap_start >= first else gap_start,
+                     max(gap_end, first + pd.Timedelta(days=1)) if gap_end <= first else gap_end)
+                    for gap_start, gap_end in gaps]
+        fetched = [_to_records(self.provider.fetch(ticker, gap_start, gap_end, interval))
+                   for gap_start, gap_end in gaps]
+        if bars is not None and len(bars) and _adjustment_changed(bars, np.concatenate(fetched)):
+            count('Price Store Refetches')
+            whole = (min([gap_start for gap_start, _ in gaps] + [pd.Timestamp(meta['start'])]),
+                     max([gap_end for _, gap_end in gaps] + [pd.Timestamp(meta['end'])]))
+            fetched = [_to_records(self.provider.fetch(ticker, *whole, interval))]
+            bars = None
+        if bars is None and not any(len(records) for records in fetched):
+            # Unknown ticker or provider failure: nothing to remember
+            return np.empty(0, dtype=BAR_DTYPE), None
+
+        merged = np.concatenate(fetched + ([np.asarray(bars)] if bars is not None else []))
+        # Keep the newest copy of each bar: fetched records come first in the merge
+        _, first = np.unique(merged['Date'], return_index=True)
+        merged = merged[first]
+
+        starts = [gap_start for gap_start, _ in gaps]
+        ends = [gap_end for _, gap_end in gaps]
+        if meta is not None:
+            starts.append(pd.Timestamp(meta['start']))
+            ends.append(pd.Timestamp(meta['end']))
+        # Coverage never extends past today, so future bars are asked for again when they exist
+        today = pd.Timestamp.today().normalize()
+        meta = {
+            'start': min(starts).isoformat(),
+            'end': min(max(ends), today + pd.Timedelta(days=1)).isoformat(),
+            'refreshed': time.time(),
+        }
+        self._write(ticker, interval, merged, meta)
+        return merged, meta
+
+
+# Function to hold an exclusive lock on a file shared with other processes
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on path (created if missing) for the duration of the block."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# Function to detect bars that Yahoo has re-adjusted since they were stored
+def _adjustment_changed(stored, fetched, rtol=1e-6):
+    """True if the Adj Close / Close factor of any bar in both stored and fetched differs."""
+    _, i, j = np.intersect1d(stored['Date'], fetched['Date'], return_indices=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        old = stored['Adj Close'][i] / stored['Close'][i]
+        new = fetched['Adj Close'][j] / fetched['Close'][j]
+    valid = np.isfinite(old) & np.isfinite(new)
+    return not np.allclose(old[valid], new[valid], rtol=rtol, atol=0)
+
+
+# Function to lay out bars of several tickers in one DataFrame
+def combine_bars(frames):
+    """
+    Combine {ticker: bars} like yf.download does: flat columns for a single requested ticker,
+    (Price, Ticker) columns for more than one. Tickers without bars are left out.
+    """
+    if len(frames) == 1:
+        return next(iter(frames.values()))
+    frames = {ticker: frame for ticker, frame in frames.items() if not frame.empty}
+    if not frames:
+        return pd.DataFrame()
+    data = pd.concat(frames, axis=1, names=['Ticker', 'Price'])
+    return data.swaplevel(axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+
+
+# Function to convert provider output to on-disk records
+def _to_records(frame):
+    records = np.empty(len(frame), dtype=BAR_DTYPE)
+    records['Date'] = pd.DatetimeIndex(frame.index).as_unit('ns').to_numpy()
+    for column in OHLCV_COLUMNS:
+        records[column] = frame[column].to_numpy(dtype='float64')
+    return records
+
+
+# Function to slice stored records into a DataFrame
+def _to_frame(bars, start, end):
+    if bars is None or len(bars) == 0:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, dtype='float64')
+    dates = bars['Date']
+    lo = np.searchsorted(dates, start.to_datetime64(), side='left')
+    hi = np.searchsorted(dates, end.to_datetime64(), side='left')
+    window = np.array(bars[lo:hi])
+    index = pd.DatetimeIndex(window['Date'], name='Date')
+    return pd.DataFrame({column: window[column] for column in OHLCV_COLUMNS}, index=index)
@@ -0,0 +1,156 @@
+import math
+
+import pandas as pd
+
+from common.fetch import NoDataError
+
+
+# Columns every provider returns, in this order
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+# Per-share fundamentals kept for valuation, and the yf.Ticker.info keys they are read from (first present wins)
+FUNDAMENTAL_FIELDS = {
+    'Price': ('currentPrice', 'regularMarketPrice', 'previousClose'),
+    'EPS': ('trailingEps',),
+    'Forward EPS': ('forwardEps',),
+    'Growth Rate': ('earningsGrowth',),
+    'Book Value': ('bookValue',),
+    'Dividend': ('dividendRate', 'trailingAnnualDividendRate'),
+}
+
+
+# Function to import yfinance with its exceptions surfaced
+def _yfinance():
+    """
+    Import yfinance (lazily, it is slow to import) and turn off its hidden exceptions.
+
+    By default yfinance logs network errors and returns empty results, which cannot be told
+    apart from a ticker without data. With them raised, transport errors reach fetch_many()
+    and are retried, and only a missing ticker or statement comes back empty.
+    """
+    import yfinance as yf
+
+    yf.config.debug.hide_exceptions = False
+    return yf
+
+
+class PriceProvider:
+    """
+    Interface for a source of OHLCV bars.
+
+    fetch() returns a DataFrame indexed by a tz-naive DatetimeIndex with OHLCV_COLUMNS,
+    covering bars with start <= date < end. An empty DataFrame means no data.
+    """
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        raise NotImplementedError
+
+
+class YahooProvider(PriceProvider):
+    """
+    Fetches bars from Yahoo Finance through yf.Ticker.history.
+
+    Each fetch builds its own Ticker, so one provider can be used from many threads. Network
+    errors are raised (so callers can retry them); a ticker Yahoo reports as missing, or with
+    no prices in the range, returns no bars.
+    """
+
+    def __init__(self, session=None, limiter=None):
+        """
+        Parameters:
+        - session: HTTP session shared by every request (yfinance's own if None)
+        - limiter: Optional TokenBucket acquired before each request
+        """
+        self.session = session
+        self.limiter = limiter
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        yf = _yfinance()
+        from yfinance.exceptions import YFTickerMissingError
+
+        if self.limiter is not None:
+            self.limiter.acquire()
+        try:
+            data = yf.Ticker(ticker, session=self.session).history(
+                start=start, end=end, interval=interval, auto_adjust=False)
+        except YFTickerMissingError:
+            data = None
+        return normalize_bars(data)
+
+
+class InMemoryProvider(PriceProvider):
+    """
+    Serves bars from DataFrames held in memory, standing in for Yahoo offline and in tests.
+
+    Every fetch is recorded in self.calls as (ticker, start, end, interval).
+    """
+
+    def __init__(self, frames):
+        self.frames = {ticker: normalize_bars(frame) for ticker, frame in frames.items()}
+        self.calls = []
+
+    def fetch(self, ticker, start, end, interval='1d'):
+        self.calls.append((ticker, pd.Timestamp(start), pd.Timestamp(end), interval))
+        frame = self.frames.get(ticker)
+        if frame is None:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return frame[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))]
+
+
+# Function to fetch one financial statement of a company from Yahoo Finance
+def fetch_statement(ticker, statement, session=None, limiter=None):
+    """
+    Return a yf.Ticker statement attribute such as 'balance_sheet' or 'financials'.
+
+    Raises NoDataError when Yahoo has no such statement for the ticker; network errors are
+    raised as they are, so fetch_many() retries them.
+    """
+    yf = _yfinance()
+
+    if limiter is not None:
+        limiter.acquire()
+    data = getattr(yf.Ticker(ticker, session=session), statement)
+    if data is None or data.empty:
+        raise NoDataError(f"{statement.replace('_', ' ')} not available")
+    return data
+
+
+# Function to fetch the valuation fundamentals of a company from Yahoo Finance
+def fetch_fundamentals(ticker, session=None, limiter=None):
+    """
+    Return a {field: value} dict of FUNDAMENTAL_FIELDS from yf.Ticker.info, NaN where missing.
+
+    Growth Rate is in percent, like the Valuation tab's input. Raises NoDataError when Yahoo
+    has neither a price nor earnings for the ticker.
+    """
+    yf = _yfinance()
+
+    if limiter is not None:
+        limiter.acquire()
+    info = yf.Ticker(ticker, session=session).info or {}
+    values = {}
+    for field, keys in FUNDAMENTAL_FIELDS.items():
+        value = next((info[key] for key in keys if isinstance(info.get(key), (int, float))), math.nan)
+        values[field] = float(value)
+    values['Growth Rate'] *= 100
+    if math.isnan(values['Price']) and math.isnan(values['EPS']):
+        raise NoDataError("fundamentals not available")
+    return values
+
+
+# Function to bring provider output to the common OHLCV layout
+def normalize_bars(data):
+    """Flatten single-ticker column levels, drop timezones and fill missing OHLCV columns."""
+    if data is None or data.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, dtype='float64')
+    data = data.copy()
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    if 'Adj Close' not in data.columns and 'Close' in data.columns:
+        data['Adj Close'] = data['Close']
+    data = data.reindex(columns=OHLCV_COLUMNS).astype('float64')
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    data.index = index.rename('Date')
+    return data.sort_index()